@@ -0,0 +1,224 @@
+# avaliacao_lote.py
+# OBJETIVO: Avaliar muitos candidatos de uma vez com operações vetorizadas do
+# NumPy, em vez de um laço Python por candidato:
+#   - melhor_relocate / melhor_swap: a varredura completa do Relocate e do Swap
+#     (ver melhoria.py), avaliando de uma só vez todas as posições da solução
+#     para cada serviço;
+#   - vizinhos_mais_proximos: as listas de candidatos da vizinhança granular
+#     (ver melhoria.calcular_vizinhos), por blocos de linhas;
+#   - ordenar_por_distancia: nós ordenados pela distância a partir de uma linha
+#     da matriz (ver construtivo.OrdemInicios).
+# Tudo é feito com "gathers" (indexação por arrays) sobre a matriz de distâncias
+# do Grafo, vista como uma matriz k x k do NumPy sem cópia, e sobre os arrays de
+# início, fim, custo e demanda dos serviços (ver modelo.py).
+#
+# O NumPy é OPCIONAL: sem ele, NUMPY_DISPONIVEL é False e o solver continua com
+# os laços em Python puro. Os resultados são os mesmos nos dois casos (mesmos
+# ganhos e, em empates, o mesmo movimento escolhido).
+
+import math
+from array import array
+
+try:
+    import numpy as np
+except ImportError: # NumPy não instalado: usa-se o caminho em Python puro.
+    np = None
+
+NUMPY_DISPONIVEL = np is not None
+
+# Abaixo deste número de posições na solução, o custo fixo de cada chamada ao
+# NumPy supera o ganho, e as vizinhanças ficam com os laços em Python.
+MIN_POSICOES_VETORIZADO = 300
+
+def _arrays(grafo):
+    """Matriz k x k e arrays dos serviços como arrays do NumPy (sem cópia)."""
+    servicos = grafo.servicos
+    matriz = np.frombuffer(grafo.matriz, dtype=np.float64).reshape(grafo.k, grafo.k)
+    return (matriz, np.frombuffer(servicos.inicio, dtype=servicos.inicio.typecode),
+            np.frombuffer(servicos.fim, dtype=servicos.fim.typecode),
+            np.frombuffer(servicos.custo, dtype=np.float64),
+            np.frombuffer(servicos.demanda, dtype=servicos.demanda.typecode))
+
+def _posicoes(rotas_info, dep, inicio, fim):
+    """
+    Arrays com uma entrada por serviço da solução, na ordem (rota, posição):
+    rota, posição, nó anterior (fim do serviço anterior ou depósito), próximo nó
+    (início do seguinte ou depósito), início e fim do próprio serviço e código.
+    """
+    rota, pos, cods = [], [], []
+    for r_idx, r in enumerate(rotas_info):
+        rota.extend([r_idx] * len(r))
+        pos.extend(range(len(r)))
+        cods.extend(r.seq)
+    rota, pos, cods = np.array(rota, dtype=np.int64), np.array(pos, dtype=np.int64), np.array(cods, dtype=np.int64)
+    ini, fim_q = inicio[cods], fim[cods]
+    ant = np.where(pos > 0, np.roll(fim_q, 1), dep)
+    prox = np.where(np.roll(pos, -1) > 0, np.roll(ini, -1), dep) if len(cods) else ini
+    return rota, pos, ant, prox, ini, fim_q, cods
+
+# Elementos (linhas x serviços) de cada bloco de vizinhos_mais_proximos: limita a
+# memória temporária a algumas dezenas de MB mesmo com dezenas de milhares de serviços.
+# O número de linhas por bloco também é limitado, para que o prazo seja consultado
+# com frequência (cada bloco leva poucos centésimos de segundo).
+ELEMENTOS_POR_BLOCO = 1 << 21
+LINHAS_POR_BLOCO = 128
+
+def vizinhos_mais_proximos(rotas_info, grafo, k_vizinhos, prazo_esgotado=None):
+    """
+    Mesmo resultado de melhoria.calcular_vizinhos (inclusive nos empates, decididos
+    pelo menor global_id), calculado com NumPy: a proximidade de um bloco de
+    serviços a todos os outros sai de quatro gathers na matriz em cada sentido, e
+    os k mais próximos de cada linha saem de um np.partition.
+    Retorna None se 'prazo_esgotado' (função sem argumentos) indicar que o prazo
+    passou antes do fim.
+    """
+    matriz, inicio, fim, _, _ = _arrays(grafo)
+    cods = np.array(sorted(cod for rota in rotas_info for cod in rota.seq), dtype=np.int64)
+    ids = cods >> 1 # Colunas em ordem de global_id: empates ficam com o menor id.
+    m = len(ids)
+    if k_vizinhos >= m - 1:
+        return {int(sid): {int(outro) for outro in ids if outro != sid} for sid in ids}
+    e1, e2 = inicio[cods], fim[cods]
+
+    vizinhos = {}
+    bloco = max(1, min(LINHAS_POR_BLOCO, ELEMENTOS_POR_BLOCO // max(m, 1)))
+    for i in range(0, m, bloco):
+        if prazo_esgotado is not None and prazo_esgotado():
+            return None
+        linhas = slice(i, min(i + bloco, m))
+        a1, a2 = e1[linhas, None], e2[linhas, None]
+        # Menor distância entre extremidades, da linha para a coluna e da coluna para a linha.
+        ida = np.minimum(np.minimum(matriz[a1, e1], matriz[a1, e2]), np.minimum(matriz[a2, e1], matriz[a2, e2]))
+        volta = np.minimum(np.minimum(matriz[e1, a1], matriz[e1, a2]), np.minimum(matriz[e2, a1], matriz[e2, a2]))
+        prox = np.minimum(ida, volta)
+        # O próprio serviço fica de fora (NaN nunca é menor nem igual a nada).
+        prox[np.arange(prox.shape[0]), np.arange(linhas.start, linhas.stop)] = np.nan
+
+        # Os k menores de cada linha: tudo abaixo do k-ésimo valor e, entre os iguais
+        # a ele, os de menor coluna (menor id) até completar k.
+        limite = np.partition(prox, k_vizinhos - 1, axis=1)[:, k_vizinhos - 1:k_vizinhos]
+        menores = prox < limite
+        iguais = prox == limite
+        faltam = k_vizinhos - menores.sum(axis=1, keepdims=True)
+        escolhidos = menores | (iguais & (np.cumsum(iguais, axis=1) <= faltam))
+        for linha, sid in enumerate(ids[linhas]):
+            vizinhos[int(sid)] = set(ids[escolhidos[linha]].tolist())
+    return vizinhos
+
+def ordenar_por_distancia(grafo, i, nos):
+    """
+    array('i') com os índices 'nos' (qualquer coleção de índices da matriz)
+    ordenados pela distância a partir do índice 'i' da matriz. A ordem entre nós
+    à mesma distância não é definida.
+    """
+    linha = grafo.linha_indice(i)
+    if np is None:
+        return array("i", sorted(nos, key=linha.__getitem__))
+    indices = np.fromiter(nos, dtype=np.intc, count=len(nos))
+    distancias = np.frombuffer(linha, dtype=np.float64)[indices]
+    ordem = array("i")
+    ordem.frombytes(indices[np.argsort(distancias)].tobytes())
+    return ordem
+
+def usar_vetorizado(rotas_info):
+    """True se o NumPy está disponível e a solução é grande o bastante para compensar."""
+    return NUMPY_DISPONIVEL and sum(len(r) for r in rotas_info) >= MIN_POSICOES_VETORIZADO
+
+def melhor_relocate(rotas_info, grafo, capacidade, prazo_esgotado=None, origens=None):
+    """
+    Varredura completa do Relocate, vetorizada por serviço: para cada serviço, o
+    ganho de inseri-lo em TODAS as posições das outras rotas sai de uma vez.
+    Retorna (melhor_ganho, (r1, s1, r2, s2), avaliacoes); o movimento é None se
+    nenhum ganho for positivo. 'prazo_esgotado', se informado, é uma função sem
+    argumentos consultada a cada serviço para interromper a varredura. Com
+    'origens' (índices de rotas), só os serviços dessas rotas são avaliados.
+    """
+    matriz, _, _, custo, demanda = _arrays(grafo)
+    dep = grafo.i_deposito
+
+    # Posições de inserção: antes de cada serviço e no fim de cada rota.
+    slot_rota, slot_pos, slot_ant, slot_prox = [], [], [], []
+    for r_idx, r in enumerate(rotas_info):
+        n = len(r)
+        slot_rota.extend([r_idx] * (n + 1))
+        slot_pos.extend(range(n + 1))
+        slot_ant.append(dep); slot_ant.extend(r.fins)
+        slot_prox.extend(r.inicios); slot_prox.append(dep)
+    slot_rota, slot_ant, slot_prox = np.array(slot_rota), np.array(slot_ant), np.array(slot_prox)
+    base = matriz[slot_ant, slot_prox]
+    demanda_rotas = np.array([r.demanda for r in rotas_info])
+    slot_demanda = demanda_rotas[slot_rota]
+
+    melhor_ganho, melhor_movimento, avaliacoes = 0, None, 0
+    for r1_idx, rota1 in enumerate(rotas_info):
+        if origens is not None and r1_idx not in origens:
+            continue
+        inicios1, fins1 = rota1.inicios, rota1.fins
+        n1 = len(rota1)
+        for s1_idx in range(n1):
+            if prazo_esgotado is not None and prazo_esgotado():
+                return melhor_ganho, melhor_movimento, avaliacoes
+            id_mover = rota1.seq[s1_idx] >> 1
+            custo_servico, demanda_s = custo[id_mover], demanda[id_mover]
+            ini_s, fim_s = inicios1[s1_idx], fins1[s1_idx]
+            ant = fins1[s1_idx - 1] if s1_idx > 0 else dep
+            prox = inicios1[s1_idx + 1] if s1_idx + 1 < n1 else dep
+            ganho_remocao = (matriz[ant, ini_s] + custo_servico + matriz[fim_s, prox]
+                             - matriz[ant, prox])
+
+            custo_insercao = matriz[slot_ant, ini_s] + custo_servico + matriz[fim_s, slot_prox] - base
+            ganhos = ganho_remocao - custo_insercao
+            viavel = (slot_rota != r1_idx) & (slot_demanda + demanda_s <= capacidade)
+            avaliacoes += int(np.count_nonzero(viavel))
+            ganhos = np.where(viavel, ganhos, -math.inf)
+            melhor = int(np.argmax(ganhos))
+            if ganhos[melhor] > melhor_ganho:
+                melhor_ganho = float(ganhos[melhor])
+                melhor_movimento = (r1_idx, s1_idx, int(slot_rota[melhor]), slot_pos[melhor])
+    return melhor_ganho, melhor_movimento, avaliacoes
+
+def melhor_swap(rotas_info, grafo, capacidade, prazo_esgotado=None, origens=None):
+    """
+    Varredura completa do Swap (pares de rotas r1 < r2), vetorizada por serviço:
+    para cada serviço s1, o ganho de trocá-lo com todos os serviços das rotas
+    seguintes sai de uma vez. Mesmo retorno e mesmo 'origens' de melhor_relocate.
+    """
+    matriz, inicio, fim, custo, demanda = _arrays(grafo)
+    dep = grafo.i_deposito
+    q_rota, q_pos, q_ant, q_prox, q_ini, q_fim, q_cods = _posicoes(rotas_info, dep, inicio, fim)
+    q_custo = custo[q_cods >> 1]
+    q_demanda = demanda[q_cods >> 1]
+    q_atual = matriz[q_ant, q_ini] + q_custo + matriz[q_fim, q_prox]
+    demanda_rotas = np.array([r.demanda for r in rotas_info])
+    q_folga = capacidade - (demanda_rotas[q_rota] - q_demanda) if len(q_cods) else q_demanda
+
+    melhor_ganho, melhor_movimento, avaliacoes = 0, None, 0
+    for r1_idx, rota1 in enumerate(rotas_info):
+        if origens is not None and r1_idx not in origens:
+            continue
+        inicios1, fins1 = rota1.inicios, rota1.fins
+        n1 = len(rota1)
+        seguintes = q_rota > r1_idx
+        for s1_idx in range(n1):
+            if prazo_esgotado is not None and prazo_esgotado():
+                return melhor_ganho, melhor_movimento, avaliacoes
+            id1 = rota1.seq[s1_idx] >> 1
+            ant1 = fins1[s1_idx - 1] if s1_idx > 0 else dep
+            prox1 = inicios1[s1_idx + 1] if s1_idx + 1 < n1 else dep
+            ini1, fim1 = inicios1[s1_idx], fins1[s1_idx]
+            custo_serv1, demanda1 = custo[id1], demanda[id1]
+            atual1 = matriz[ant1, ini1] + custo_serv1 + matriz[fim1, prox1]
+
+            # Capacidade: s2 cabe na rota 1 sem s1, e s1 cabe na rota de s2 sem s2.
+            viavel = seguintes & (rota1.demanda - demanda1 + q_demanda <= capacidade) & (demanda1 <= q_folga)
+            avaliacoes += int(np.count_nonzero(seguintes))
+            novo1 = matriz[ant1, q_ini] + q_custo + matriz[q_fim, prox1]
+            novo2 = matriz[q_ant, ini1] + custo_serv1 + matriz[fim1, q_prox]
+            ganhos = np.where(viavel, (atual1 + q_atual) - (novo1 + novo2), -math.inf)
+            if not len(ganhos):
+                continue
+            melhor = int(np.argmax(ganhos))
+            if ganhos[melhor] > melhor_ganho:
+                melhor_ganho = float(ganhos[melhor])
+                melhor_movimento = (r1_idx, s1_idx, int(q_rota[melhor]), int(q_pos[melhor]))
+    return melhor_ganho, melhor_movimento, avaliacoes
@@ -0,0 +1,163 @@
+# benchmark.py
+# OBJETIVO: Medir o tempo de cada etapa do solver em instâncias sintéticas de
+# tamanho crescente e comparar com uma base gravada anteriormente, para
+# detectar regressões de desempenho.
+#
+# Etapas medidas em cada instância:
+#   - leitura:     ler_instancia_completa (texto .dat, sem o formato compilado);
+#   - grafo:       construção do Grafo (CSR + matriz de distâncias, sem cache em disco);
+#   - construtivo: o restante de gerar_solucao_viavel, após o Grafo;
+#   - relocate / swap / 2opt: UMA varredura completa de cada vizinhança do VNS,
+#     aplicadas em sequência sobre a solução do construtivo.
+# Cada etapa é repetida '--repeticoes' vezes e fica o MENOR tempo, que é o menos
+# afetado por ruído da máquina. O custo da solução construtiva também é gravado:
+# se ele mudar, o solver mudou de comportamento e os tempos não são comparáveis.
+#
+# Uso:
+#   python benchmark.py --salvar-base        # mede e grava a base
+#   python benchmark.py                      # mede e compara com a base
+# Retorna código de saída 1 se alguma etapa ficar mais lenta que a tolerância.
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from leitura import ler_instancia_completa
+from construtivo import gerar_solucao_viavel
+from melhoria import find_best_relocate, find_best_swap, find_best_2opt
+from metricas import METRICAS
+from gerador_instancias import gerar_instancia
+
+# --- SUÍTE ---
+# nome -> (número de nós, número de serviços requeridos, semente)
+SUITE = {
+    "P": (500, 120, 1),
+    "M": (3000, 400, 2),
+    "G": (10000, 700, 3),
+    "GG": (30000, 1000, 4),
+}
+SUITE_PADRAO = ("P", "M", "G")
+
+ETAPAS = ("leitura", "grafo", "construtivo", "relocate", "swap", "2opt")
+
+def preparar_instancias(nomes, pasta):
+    """Gera (se ainda não existirem) os arquivos .dat da suíte e retorna seus caminhos."""
+    os.makedirs(pasta, exist_ok=True)
+    caminhos = {}
+    for nome in nomes:
+        num_nos, num_servicos, semente = SUITE[nome]
+        caminho = os.path.join(pasta, f"sint-{nome}-{num_nos}-{num_servicos}-{semente}.dat")
+        if not os.path.exists(caminho):
+            gerar_instancia(caminho, num_nos, num_servicos, semente)
+        caminhos[nome] = caminho
+    return caminhos
+
+def medir_instancia(caminho):
+    """Executa todas as etapas UMA vez e retorna (tempos por etapa, custo construtivo)."""
+    tempos = {}
+    METRICAS.reiniciar()
+
+    inicio = time.perf_counter()
+    dados = ler_instancia_completa(caminho)
+    tempos["leitura"] = time.perf_counter() - inicio
+
+    # As mensagens de progresso do solver são descartadas durante a medição.
+    with contextlib.redirect_stdout(io.StringIO()):
+        rotas, grafo = gerar_solucao_viavel(dados)
+        tempos["grafo"] = METRICAS.tempos["etapa.grafo"]
+        tempos["construtivo"] = METRICAS.tempos["etapa.construtivo"]
+        custo = sum(r.custo for r in rotas)
+
+        for nome, vizinhanca in (("relocate", find_best_relocate), ("swap", find_best_swap), ("2opt", find_best_2opt)):
+            inicio = time.perf_counter()
+            vizinhanca(rotas, dados, grafo)
+            tempos[nome] = time.perf_counter() - inicio
+
+    return tempos, custo
+
+def rodar_suite(nomes, pasta, repeticoes):
+    """Mede cada instância 'repeticoes' vezes e guarda o menor tempo de cada etapa."""
+    resultados = {}
+    for nome, caminho in preparar_instancias(nomes, pasta).items():
+        melhores, custo = None, None
+        for _ in range(repeticoes):
+            tempos, custo = medir_instancia(caminho)
+            melhores = tempos if melhores is None else {e: min(melhores[e], tempos[e]) for e in ETAPAS}
+        resultados[nome] = {"arquivo": os.path.basename(caminho), "custo_construtivo": custo, "tempos": melhores}
+        print(f"{nome:<4} " + "  ".join(f"{e}={melhores[e]:.4f}s" for e in ETAPAS))
+    return resultados
+
+def comparar(resultados, base, tolerancia, minimo):
+    """
+    Compara os tempos com a base. Uma etapa é regressão quando fica mais de
+    'tolerancia' (fração) acima da base e a diferença passa de 'minimo' segundos
+    (tempos muito pequenos variam demais para serem comparados).
+    Retorna a lista de regressões encontradas.
+    """
+    regressoes = []
+    print("\n--- Comparação com a base ---")
+    for nome, atual in resultados.items():
+        anterior = base.get(nome)
+        if anterior is None:
+            print(f"{nome:<4} (sem base)")
+            continue
+        if anterior["custo_construtivo"] != atual["custo_construtivo"]:
+            print(f"{nome:<4} AVISO: custo construtivo mudou ({anterior['custo_construtivo']} -> {atual['custo_construtivo']}).")
+        for etapa in ETAPAS:
+            t_base, t_atual = anterior["tempos"][etapa], atual["tempos"][etapa]
+            razao = t_atual / t_base if t_base > 0 else 1.0
+            marca = ""
+            if razao > 1 + tolerancia and t_atual - t_base > minimo:
+                marca = "  <-- REGRESSÃO"
+                regressoes.append((nome, etapa, t_base, t_atual))
+            print(f"{nome:<4} {etapa:<12} base={t_base:.4f}s atual={t_atual:.4f}s ({razao:.2f}x){marca}")
+    return regressoes
+
+def main():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Benchmark do solver em instâncias sintéticas.")
+    parser.add_argument("--instancias", default=",".join(SUITE_PADRAO),
+                        help=f"Instâncias da suíte, separadas por vírgula (disponíveis: {','.join(SUITE)}).")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Repetições por instância (padrão: 3).")
+    parser.add_argument("--base", default=os.path.join(base_dir, "Benchmark", "base.json"), help="Arquivo da base.")
+    parser.add_argument("--salvar-base", action="store_true", help="Grava os tempos medidos como a nova base.")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="Aumento relativo tolerado (padrão: 0.25).")
+    parser.add_argument("--minimo", type=float, default=0.01, help="Diferença mínima, em segundos, para contar como regressão.")
+    args = parser.parse_args()
+
+    nomes = [n.strip() for n in args.instancias.split(",") if n.strip()]
+    desconhecidas = [n for n in nomes if n not in SUITE]
+    if desconhecidas:
+        parser.error(f"instâncias desconhecidas: {', '.join(desconhecidas)}")
+
+    pasta = os.path.join(base_dir, "Benchmark", "Instancias")
+    resultados = rodar_suite(nomes, pasta, args.repeticoes)
+
+    if args.salvar_base:
+        base = {}
+        if os.path.exists(args.base):
+            with open(args.base, encoding="utf-8") as f:
+                base = json.load(f)
+        base.update(resultados)
+        os.makedirs(os.path.dirname(args.base), exist_ok=True)
+        with open(args.base, "w", encoding="utf-8") as f:
+            json.dump(base, f, indent=2)
+        print(f"\nBase gravada em {args.base}")
+        return
+
+    if not os.path.exists(args.base):
+        print(f"\nSem base em {args.base}; rode com --salvar-base para criar uma.")
+        return
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    regressoes = comparar(resultados, base, args.tolerancia, args.minimo)
+    if regressoes:
+        print(f"\n{len(regressoes)} regressão(ões) de desempenho encontrada(s).")
+        sys.exit(1)
+    print("\nNenhuma regressão de desempenho.")
+
+if __name__ == "__main__":
+    main()
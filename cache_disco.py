@@ -0,0 +1,106 @@
+# cache_disco.py
+# OBJETIVO: Guardar em disco a matriz de distâncias entre nós de serviço calculada
+# pelo Grafo, para que execuções seguintes sobre a MESMA instância não precisem
+# rodar o Dijkstra de novo. A chave do cache é um hash do conteúdo da instância
+# (topologia, custos e nós de serviço), então renomear o arquivo .dat não invalida
+# o cache e qualquer mudança nos dados gera uma chave nova.
+#
+# FORMATO DO ARQUIVO (<chave>.dist), tudo little-endian:
+#   - 8 bytes: assinatura b"CARPDIST"
+#   - 8 bytes: k (quantidade de nós de serviço), int64
+#   - 8*k bytes: os números dos nós, int64
+#   - 8*k*k bytes: a matriz de distâncias, float64, linha a linha
+# Todos os blocos começam em múltiplos de 8, então a matriz pode ser usada direto
+# do mapeamento em memória (mmap), sem cópia.
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+ASSINATURA = b"CARPDIST"
+VERSAO_CHAVE = b"v1"
+
+def hash_instancia(dados, nos_servico):
+    """
+    Calcula a chave do cache a partir do conteúdo da instância. A ordem das conexões
+    no arquivo não importa.
+    """
+    h = hashlib.sha256(VERSAO_CHAVE)
+    h.update(f"{dados['deposito']}|{dados['num_vertices']}|".encode())
+    for u, v, custo, tipo in sorted(dados["conexoes"]):
+        h.update(f"{u},{v},{custo},{tipo};".encode())
+    h.update(b"|")
+    h.update(",".join(map(str, nos_servico)).encode())
+    return h.hexdigest()
+
+def _caminho(pasta, chave):
+    return os.path.join(pasta, f"{chave}.dist")
+
+def salvar_matriz(pasta, chave, nos_servico, matriz):
+    """
+    Grava a matriz no cache. A escrita é feita em um arquivo temporário e depois
+    renomeada, para que um leitor concorrente nunca veja um arquivo pela metade.
+    """
+    salvar_linhas(pasta, chave, nos_servico, (matriz,))
+
+def salvar_linhas(pasta, chave, nos_servico, blocos):
+    """
+    Como salvar_matriz, mas a matriz chega em 'blocos' (iterável de buffers de
+    float64 com linhas inteiras, em ordem), gravados à medida que são gerados:
+    a matriz completa nunca precisa estar em memória.
+    """
+    os.makedirs(pasta, exist_ok=True)
+    nos = array('q', nos_servico)
+    if sys.byteorder != "little":
+        nos.byteswap()
+    destino = _caminho(pasta, chave)
+    temporario = f"{destino}.{os.getpid()}.tmp"
+    with open(temporario, "wb") as f:
+        f.write(ASSINATURA)
+        f.write(struct.pack("<q", len(nos)))
+        nos.tofile(f)
+        for bloco in blocos:
+            if sys.byteorder != "little":
+                bloco = array('d', bloco)
+                bloco.byteswap()
+            f.write(memoryview(bloco).cast('B'))
+    os.replace(temporario, destino)
+
+def carregar_matriz(pasta, chave):
+    """
+    Abre a matriz do cache via mmap.
+
+    Returns:
+        tuple: (nos_servico, matriz), onde 'matriz' é um memoryview de float64 apoiado
+        diretamente no arquivo mapeado. Retorna None se a entrada não existir ou
+        estiver corrompida.
+    """
+    caminho = _caminho(pasta, chave)
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, "rb") as f:
+        tamanho = os.fstat(f.fileno()).st_size
+        if tamanho < 16:
+            return None
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if mm[:8] != ASSINATURA:
+        return None
+    k = struct.unpack_from("<q", mm, 8)[0]
+    inicio_matriz = 16 + 8 * k
+    if tamanho != inicio_matriz + 8 * k * k:
+        return None
+
+    # O mapeamento é little-endian; em máquinas big-endian fazemos uma cópia convertida.
+    if sys.byteorder != "little":
+        nos = array('q', mm[16:inicio_matriz]); nos.byteswap()
+        matriz = array('d', mm[inicio_matriz:]); matriz.byteswap()
+        return list(nos), memoryview(matriz)
+
+    visao = memoryview(mm)
+    nos = visao[16:inicio_matriz].cast('q').tolist()
+    matriz = visao[inicio_matriz:].cast('d')
+    return nos, matriz
@@ -0,0 +1,74 @@
+# cache_memoria.py
+# OBJETIVO: Cache em memória das distâncias completas a partir de uma origem
+# (usado por Grafo.obter_distancias), com limite opcional de entradas e/ou de
+# bytes. Quando o limite é atingido, sai a origem usada há mais tempo (LRU).
+#
+# Cada entrada é um array('d') com uma posição por nó do grafo, então em grafos
+# muito grandes guardar todas as origens já consultadas esgota a memória; com
+# um limite, o custo passa a ser recalcular o Dijkstra de origens esquecidas.
+
+from collections import OrderedDict
+
+class CacheLRU:
+    """
+    Dicionário origem -> array de distâncias com remoção da entrada menos usada
+    recentemente. 'max_entradas' e 'max_bytes' são opcionais (None = sem limite);
+    o tamanho de uma entrada é o de seu buffer (len * itemsize).
+
+    Guarda estatísticas de acertos, falhas e remoções.
+    """
+    def __init__(self, max_entradas=None, max_bytes=None):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._dados = OrderedDict()
+        self.bytes = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.remocoes = 0
+
+    def __len__(self):
+        return len(self._dados)
+
+    def __contains__(self, origem):
+        return origem in self._dados
+
+    def __getitem__(self, origem):
+        return self._dados[origem]
+
+    def obter(self, origem):
+        """Retorna a entrada (marcando-a como usada agora) ou None, contando acerto/falha."""
+        valor = self._dados.get(origem)
+        if valor is None:
+            self.falhas += 1
+            return None
+        self.acertos += 1
+        self._dados.move_to_end(origem)
+        return valor
+
+    def guardar(self, origem, valor):
+        """Insere a entrada e remove as menos usadas até respeitar os limites."""
+        if origem in self._dados:
+            self.bytes -= _tamanho(self._dados.pop(origem))
+        self._dados[origem] = valor
+        self.bytes += _tamanho(valor)
+        # A entrada recém-inserida nunca é removida, mesmo se sozinha passar do limite.
+        while len(self._dados) > 1 and self._excedido():
+            _, removido = self._dados.popitem(last=False)
+            self.bytes -= _tamanho(removido)
+            self.remocoes += 1
+
+    def _excedido(self):
+        return ((self.max_entradas is not None and len(self._dados) > self.max_entradas) or
+                (self.max_bytes is not None and self.bytes > self.max_bytes))
+
+    def limpar(self):
+        self._dados.clear()
+        self.bytes = 0
+
+    def estatisticas(self):
+        """Dicionário com o estado e os contadores do cache."""
+        return {"entradas": len(self._dados), "bytes": self.bytes, "acertos": self.acertos,
+                "falhas": self.falhas, "remocoes": self.remocoes}
+
+def _tamanho(valor):
+    return len(valor) * valor.itemsize
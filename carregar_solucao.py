@@ -0,0 +1,77 @@
+# carregar_solucao.py
+# OBJETIVO: Ler de volta um arquivo de solução (sol-<instância>.dat, no formato
+# gravado por rodar_todas.escrever_solucao_formato_pdf) como uma lista de
+# modelo.Rota, para que a busca local possa partir de uma solução já conhecida
+# ("warm start") em vez de reconstruí-la com o construtivo.
+#
+# VALIDAÇÃO: a solução só é aceita se for coerente com a instância carregada:
+#   - cada "(S id,p1,p2)" existe na instância e (p1, p2) são as pontas do serviço
+#     em um sentido permitido (o sentido define o código orientado);
+#   - cada serviço aparece exatamente uma vez;
+#   - nenhuma rota passa da capacidade e todas são alcançáveis;
+#   - o número de rotas, a demanda e o custo de cada rota e o custo total batem
+#     com o que está declarado no arquivo (o que também detecta um arquivo de
+#     outra versão da instância).
+# Qualquer inconsistência gera ValueError com o motivo.
+
+import math
+import re
+from modelo import Rota, TIPO_ARESTA, codigo
+
+_VISITA = re.compile(r"\(([DS]) (\d+),(\d+),(\d+)\)")
+
+def carregar_solucao(caminho, dados, grafo):
+    """
+    Lê o arquivo de solução 'caminho' e retorna a lista de Rota correspondente,
+    validada contra a instância ('dados') e o seu Grafo.
+    """
+    with open(caminho, encoding="utf-8") as f:
+        linhas = [linha.strip() for linha in f if linha.strip()]
+    if len(linhas) < 4:
+        raise ValueError(f"{caminho}: cabeçalho incompleto.")
+    custo_declarado, num_rotas = float(linhas[0]), int(linhas[1])
+    if len(linhas) - 4 != num_rotas:
+        raise ValueError(f"{caminho}: {num_rotas} rotas declaradas, {len(linhas) - 4} encontradas.")
+
+    servicos = grafo.servicos
+    atendidos = bytearray(servicos.total + 1)
+    rotas = []
+    for linha in linhas[4:]:
+        campos = linha.split(maxsplit=6)
+        if len(campos) < 7:
+            raise ValueError(f"{caminho}: linha de rota incompleta: '{linha}'.")
+        demanda_declarada, custo_rota = int(campos[3]), float(campos[4])
+        seq = [_codigo(int(sid), int(p1), int(p2), servicos, caminho)
+               for tipo, sid, p1, p2 in _VISITA.findall(linha) if tipo == "S"]
+        for cod in seq:
+            if atendidos[cod >> 1]:
+                raise ValueError(f"{caminho}: serviço {cod >> 1} atendido mais de uma vez.")
+            atendidos[cod >> 1] = 1
+
+        rota = Rota(seq, grafo)
+        if rota.demanda > dados["capacidade"]:
+            raise ValueError(f"{caminho}: rota {campos[2]} excede a capacidade ({rota.demanda} > {dados['capacidade']}).")
+        if rota.custo == math.inf:
+            raise ValueError(f"{caminho}: rota {campos[2]} é inalcançável.")
+        if rota.demanda != demanda_declarada or round(rota.custo) != custo_rota:
+            raise ValueError(f"{caminho}: rota {campos[2]} declara demanda {demanda_declarada} e custo {custo_rota:g}, "
+                             f"mas na instância tem {rota.demanda} e {rota.custo:g}.")
+        rotas.append(rota)
+
+    faltando = [sid for sid in servicos.ids() if not atendidos[sid]]
+    if faltando:
+        raise ValueError(f"{caminho}: {len(faltando)} serviço(s) não atendido(s) (ex.: {faltando[0]}).")
+    custo_total = sum(r.custo for r in rotas)
+    if round(custo_total) != custo_declarado:
+        raise ValueError(f"{caminho}: custo total declarado {custo_declarado:g}, calculado {custo_total:g}.")
+    return rotas
+
+def _codigo(sid, p1, p2, servicos, caminho):
+    """Código orientado do serviço 'sid' percorrido de p1 para p2."""
+    if not 1 <= sid <= servicos.total:
+        raise ValueError(f"{caminho}: serviço {sid} não existe na instância.")
+    if (p1, p2) == (servicos.u[sid], servicos.v[sid]):
+        return codigo(sid)
+    if servicos.tipo[sid] == TIPO_ARESTA and (p1, p2) == (servicos.v[sid], servicos.u[sid]):
+        return codigo(sid, 1)
+    raise ValueError(f"{caminho}: (S {sid},{p1},{p2}) não corresponde às pontas do serviço {sid}.")
@@ -3,35 +3,146 @@
 # resolver o problema. Ela gera uma solução inicial que é viável (respeita
 # todas as regras), mas não necessariamente ótima.
 
+import heapq
 import math
-from grafo import Grafo, calcular_custo_rota
+import random
+import time
+from collections import deque
+from cache_memoria import CacheLRU
+from avaliacao_lote import ordenar_por_distancia
+from grafo import Grafo
+from modelo import Rota, TIPO_ARESTA, CODIGO_DEPOSITO, codigo
+from metricas import METRICAS
 
-def gerar_solucao_viavel(dados):
+# Limite de memória das ordens de visita por linha da matriz (ver OrdemInicios).
+MAX_BYTES_ORDENS = 64 << 20
+
+def indexar_por_inicio(servicos):
+    """
+    Índice dos serviços ainda não atendidos, pelo código orientado (ver modelo.py),
+    agrupados pelo nó (índice na matriz) onde cada sentido começa: nós e arcos
+    têm um código, arestas um por sentido (um em 'u' e outro em 'v').
+    Retorna um dict: índice do nó -> set com os códigos.
+
+    Assim, o custo de inserir um código a partir da posição atual é uma única
+    consulta, distância até o nó de início + custo do serviço, e o sentido de uma
+    aresta não precisa ser escolhido à parte: cada sentido é um candidato.
+    """
+    por_inicio = {}
+    for global_id in servicos.ids():
+        for cod in _codigos(global_id, servicos):
+            por_inicio.setdefault(servicos.inicio[cod], set()).add(cod)
+    return por_inicio
+
+def _codigos(global_id, servicos):
+    """Códigos orientados do serviço: os dois sentidos de uma aresta, o único de nós e arcos."""
+    cod = codigo(global_id)
+    if servicos.tipo[global_id] == TIPO_ARESTA:
+        return (cod, cod + 1)
+    return (cod,)
+
+def _remover_pendente(por_inicio, global_id, servicos):
+    """Remove o serviço (todos os sentidos) do índice; nós de início sem pendentes saem do índice."""
+    for cod in _codigos(global_id, servicos):
+        no = servicos.inicio[cod]
+        pendentes_no = por_inicio[no]
+        pendentes_no.discard(cod)
+        if not pendentes_no:
+            del por_inicio[no]
+
+class OrdemInicios:
+    """
+    Nós de início dos serviços ordenados pela distância a partir de uma linha da
+    matriz. OTIMIZAÇÃO: a ordem de cada linha é calculada na primeira vez que a
+    linha é usada (só com os nós pendentes nesse momento) e depois reaproveitada,
+    percorrida pulando os nós que ficaram sem pendentes: como o índice só perde
+    nós, a ordem guardada continua cobrindo todos os pendentes, e quem a percorre
+    para cedo (ver a parada antecipada da escolha gulosa).
+    As linhas se repetem (o depósito em toda rota nova, nós que terminam vários
+    serviços), e as ordens ficam em um CacheLRU limitado a 'max_bytes'.
+    """
+    def __init__(self, g, max_bytes=MAX_BYTES_ORDENS):
+        self.g = g
+        self.ordens = CacheLRU(max_bytes=max_bytes)
+
+    def ordem(self, i, por_inicio):
+        """Nós de início (array('i')) do mais próximo de 'i' ao mais distante; pode conter nós já fora de 'por_inicio'."""
+        ordem = self.ordens.obter(i)
+        if ordem is None:
+            ordem = ordenar_por_distancia(self.g, i, por_inicio)
+            self.ordens.guardar(i, ordem)
+        return ordem
+
+def _candidatos_rcl(por_inicio, distancias_atuais, servicos, folga, tamanho, ordem):
+    """
+    Lista restrita de candidatos (RCL): os 'tamanho' serviços pendentes mais baratos
+    de inserir a partir da posição atual que cabem na capacidade restante ('folga').
+    Retorna uma lista de (custo, global_id, código), do mais barato ao mais caro.
+    Usa a mesma parada antecipada da escolha gulosa, comparando com o pior da lista.
+    'ordem' são os nós de início a partir da posição atual (ver OrdemInicios).
+
+    Cada serviço entra uma vez só: como os nós são percorridos do mais próximo ao
+    mais distante, o primeiro sentido visto de uma aresta é o mais barato; o outro
+    só conta em empate, quando fica o sentido original (código par).
+    """
+    demanda, custo_servico = servicos.demanda, servicos.custo
+    lista = [] # heap de máximo (custos negativos) com os melhores candidatos
+    vistos = {} # global_id -> (custo, código) do sentido escolhido
+    for no_inicio in ordem:
+        pendentes_no = por_inicio.get(no_inicio)
+        if pendentes_no is None:
+            continue # Nó sem pendentes desde que a ordem foi calculada.
+        distancia_inicio = distancias_atuais[no_inicio]
+        if distancia_inicio == math.inf or (len(lista) == tamanho and distancia_inicio > -lista[0][0]):
+            break
+        for cod in pendentes_no:
+            global_id = cod >> 1
+            if demanda[global_id] > folga:
+                continue
+            custo = distancia_inicio + custo_servico[global_id]
+            visto = vistos.get(global_id)
+            if visto is not None:
+                if (custo, cod) < visto:
+                    vistos[global_id] = (custo, cod)
+                continue
+            vistos[global_id] = (custo, cod)
+            item = (-custo, -global_id)
+            if len(lista) < tamanho:
+                heapq.heappush(lista, item)
+            elif item > lista[0]:
+                heapq.heapreplace(lista, item)
+    return sorted((-c, -gid, vistos[-gid][1]) for c, gid in lista)
+
+def gerar_solucao_viavel(dados, pasta_cache=None, grafo=None, semente=None, tamanho_rcl=3):
     """
     Constrói uma solução inicial usando uma heurística de inserção gulosa (greedy).
     A estratégia é sempre escolher o próximo serviço "mais barato" para adicionar a uma rota.
+    'pasta_cache' é repassada ao Grafo para reaproveitar a matriz de distâncias em disco.
+    Se 'grafo' for informado, ele é reaproveitado em vez de construir um novo.
+
+    MODO ALEATORIZADO: com uma 'semente', cada passo sorteia o próximo serviço entre
+    os 'tamanho_rcl' mais baratos (lista restrita de candidatos, como no GRASP).
+    A mesma semente gera sempre a mesma solução. Sem semente, a escolha é a gulosa.
+
+    Retorna (rotas, grafo), onde 'rotas' é uma lista de modelo.Rota.
     """
     capacidade = dados["capacidade"]
-    deposito = dados["deposito"]
-    reqs = dados["requisitos"]
+    rng = random.Random(semente) if semente is not None else None
 
     # 1. INICIALIZAÇÃO
     # Cria o objeto Grafo que usaremos para todos os cálculos de distância.
-    g = Grafo(dados)
-
-    # Cria uma lista única com todos os serviços (nós, arestas e arcos).
-    servicos = []
-    id_global = 1
-    for s_type, s_list in [('N', reqs["nos"]), ('E', reqs["arestas"]), ('A', reqs["arcos"])]:
-        for s_orig in s_list:
-            s = s_orig.copy()
-            s['tipo'] = s_type
-            s['global_id'] = id_global
-            s['atendido'] = False # Flag para controlar quais serviços já foram alocados.
-            servicos.append(s)
-            id_global += 1
-
-    total_servicos = len(servicos)
+    # Ele também traz os serviços (nós, arestas e arcos) em arrays indexados pelo global_id.
+    with METRICAS.cronometrar("etapa.grafo"):
+        g = grafo if grafo is not None else Grafo(dados, pasta_cache)
+    inicio_construcao = time.perf_counter()
+    servicos = g.servicos
+    demanda, custo_servico = servicos.demanda, servicos.custo
+
+    # Índice dos serviços pendentes pelo nó de início; serviços atendidos saem dele.
+    por_inicio = indexar_por_inicio(servicos)
+    ordem_inicios = OrdemInicios(g)
+
+    total_servicos = servicos.total
     servicos_atendidos_cont = 0
     rotas_finais = []
 
@@ -41,81 +152,194 @@ def gerar_solucao_viavel(dados):
     while servicos_atendidos_cont < total_servicos:
         servicos_atendidos_antes = servicos_atendidos_cont
         carga_atual = 0
-        seq_serv_rota_obj = []
-        pos_atual = deposito # Toda nova rota começa no depósito.
+        seq_rota = []
+        # Posição do veículo como índice na matriz: o fim do último serviço atendido.
+        # Toda nova rota começa no depósito (ver modelo.CODIGO_DEPOSITO).
+        i_atual = servicos.fim[CODIGO_DEPOSITO]
 
         # 3. LOOP DE CONSTRUÇÃO DA ROTA ATUAL
         # Este 'while' interno adiciona serviços à rota atual até ela ficar cheia.
         while True:
-            # Usa o grafo para obter as distâncias do ponto atual para todos os outros nós.
-            # Graças ao cache, isso é rápido se a 'pos_atual' já foi visitada.
-            distancias_atuais = g.obter_distancias(pos_atual)
-            melhor_indice = -1
+            # Usa a linha da matriz de distâncias do ponto atual para os nós de serviço.
+            # Cada consulta é um acesso O(1) por índice (ver Grafo.indice).
+            distancias_atuais = g.linha_indice(i_atual)
+            ordem = ordem_inicios.ordem(i_atual, por_inicio)
+            melhor_id = -1
             menor_custo_insercao = math.inf
-            p1_escolhido, p2_escolhido, prox_pos_escolhida = 0, 0, -1
-
-            # 4. ENCONTRAR O MELHOR SERVIÇO PARA INSERIR
-            # Itera sobre todos os serviços para encontrar o "mais barato" para adicionar agora.
-            for i, s in enumerate(servicos):
-                # CONDIÇÕES DE FILTRO:
-                # - O serviço não pode já ter sido atendido.
-                # - A demanda do serviço não pode exceder a capacidade restante do veículo.
-                if s['atendido'] or (carga_atual + s['demanda'] > capacidade):
-                    continue
-
-                custo_candidato_atual, p1_temp, p2_temp, pos_final_temp = math.inf, 0, 0, 0
-                u, v, s_custo, t_custo = s['u'], s['v'], s['s_custo'], s['t_custo']
-
-                # CÁLCULO DO CUSTO DE INSERÇÃO para cada tipo de serviço
-                if s['tipo'] == 'N': # Nó
-                    custo_viagem = distancias_atuais.get(u, math.inf)
-                    if custo_viagem != math.inf:
-                        custo_candidato_atual, p1_temp, p2_temp, pos_final_temp = custo_viagem + s_custo, u, u, u
-                elif s['tipo'] == 'E': # Aresta (pode ser percorrida em dois sentidos)
-                    custo_vu = distancias_atuais.get(u, math.inf)
-                    custo1 = (custo_vu + t_custo + s_custo) if custo_vu != math.inf else math.inf
-                    custo_vv = distancias_atuais.get(v, math.inf)
-                    custo2 = (custo_vv + t_custo + s_custo) if custo_vv != math.inf else math.inf
-                    if custo1 <= custo2 and custo1 != math.inf: # Escolhe o sentido mais barato
-                        custo_candidato_atual, p1_temp, p2_temp, pos_final_temp = custo1, u, v, v
-                    elif custo2 < custo1 and custo2 != math.inf:
-                        custo_candidato_atual, p1_temp, p2_temp, pos_final_temp = custo2, v, u, u
-                elif s['tipo'] == 'A': # Arco (sentido único)
-                    custo_viagem = distancias_atuais.get(u, math.inf)
-                    if custo_viagem != math.inf:
-                        custo_candidato_atual, p1_temp, p2_temp, pos_final_temp = custo_viagem + t_custo + s_custo, u, v, v
-
-                # --- A ESCOLHA GULOSA (GREEDY) ---
-                # Se o custo do candidato atual é o menor que encontramos até agora,
-                # ele se torna o nosso novo "melhor candidato".
-                if custo_candidato_atual < menor_custo_insercao:
-                    menor_custo_insercao, melhor_indice = custo_candidato_atual, i
-                    p1_escolhido, p2_escolhido, prox_pos_escolhida = p1_temp, p2_temp, pos_final_temp
+            cod_escolhido = -1
+
+            if rng is not None:
+                # Modo aleatorizado: sorteia entre os candidatos da RCL.
+                rcl = _candidatos_rcl(por_inicio, distancias_atuais, servicos, capacidade - carga_atual, tamanho_rcl, ordem)
+                if rcl:
+                    menor_custo_insercao, melhor_id, cod_escolhido = rng.choice(rcl)
+            else:
+                # 4. ENCONTRAR O MELHOR SERVIÇO PARA INSERIR
+                # Percorre os nós de início dos serviços pendentes do mais próximo ao mais
+                # distante. Como o custo de um serviço é sempre >= a distância até o seu
+                # início, a busca para assim que essa distância passa do melhor custo achado.
+                # Cada sentido de uma aresta é um código à parte, com custo de uma consulta só.
+                # Em caso de empate vence o menor código: o menor global_id e, na mesma
+                # aresta, o sentido original, como na varredura completa.
+                for no_inicio in ordem:
+                    pendentes_no = por_inicio.get(no_inicio)
+                    if pendentes_no is None:
+                        continue # Nó sem pendentes desde que a ordem foi calculada.
+                    distancia_inicio = distancias_atuais[no_inicio]
+                    if distancia_inicio > menor_custo_insercao or distancia_inicio == math.inf:
+                        break
+                    for cod_temp in pendentes_no:
+                        global_id = cod_temp >> 1
+                        # A demanda do serviço não pode exceder a capacidade restante do veículo.
+                        if carga_atual + demanda[global_id] > capacidade:
+                            continue
+
+                        custo_candidato_atual = distancia_inicio + custo_servico[global_id]
+
+                        # --- A ESCOLHA GULOSA (GREEDY) ---
+                        # Se o custo do candidato atual é o menor que encontramos até agora,
+                        # ele se torna o nosso novo "melhor candidato".
+                        if custo_candidato_atual < menor_custo_insercao or \
+                           (custo_candidato_atual == menor_custo_insercao and cod_temp < cod_escolhido):
+                            menor_custo_insercao, melhor_id, cod_escolhido = custo_candidato_atual, global_id, cod_temp
             
             # 5. ADICIONAR O SERVIÇO ESCOLHIDO À ROTA
-            if melhor_indice != -1:
-                servico_escolhido = servicos[melhor_indice]
-                servico_escolhido['atendido'] = True # Marca como atendido
+            if melhor_id != -1:
+                _remover_pendente(por_inicio, melhor_id, servicos)
                 servicos_atendidos_cont += 1
-                carga_atual += servico_escolhido['demanda']
-                seq_serv_rota_obj.append((servico_escolhido['global_id'], p1_escolhido, p2_escolhido, servico_escolhido['demanda'], servico_escolhido['s_custo'], servico_escolhido['t_custo']))
-                pos_atual = prox_pos_escolhida # Atualiza a posição do veículo
+                carga_atual += demanda[melhor_id]
+                seq_rota.append(cod_escolhido)
+                i_atual = servicos.fim[cod_escolhido] # Atualiza a posição do veículo
             else:
                 # Se nenhum serviço pôde ser adicionado, a rota atual está finalizada.
                 break
         
         # 6. FINALIZAR E SALVAR A ROTA
-        if seq_serv_rota_obj:
-            # Calcula o custo final da rota (incluindo a volta ao depósito).
-            custo_rota_final = calcular_custo_rota(seq_serv_rota_obj, g, deposito)
-            if custo_rota_final == math.inf:
+        if seq_rota:
+            # A Rota calcula o custo final (incluindo a volta ao depósito) e a carga.
+            rota = Rota(seq_rota, g)
+            if rota.custo == math.inf:
                 print(f"ERRO ({dados['nome']}): Rota inviável detectada durante construção!")
             # Salva a rota completa com todas as suas informações.
-            rotas_finais.append({"servicos": seq_serv_rota_obj, "servicos_str": [f"(S {s[0]},{s[1]},{s[2]})" for s in seq_serv_rota_obj], "demanda": carga_atual, "custo": custo_rota_final})
+            rotas_finais.append(rota)
 
         # Medida de segurança para evitar loops infinitos.
         if servicos_atendidos_cont == servicos_atendidos_antes and servicos_atendidos_cont < total_servicos:
             print(f"AVISO CRÍTICO ({dados['nome']}): Loop estagnado. {total_servicos - servicos_atendidos_cont} serviços não atendidos. Parando.")
             break
-            
-    return rotas_finais, g
\ No newline at end of file
+
+    METRICAS.adicionar_tempo("etapa.construtivo", time.perf_counter() - inicio_construcao)
+    return rotas_finais, g
+
+
+# --- ROTA PRIMEIRO, DIVISÃO DEPOIS (route-first, cluster-second) ---
+# Alternativa ao construtivo acima: primeiro monta UMA sequência com todos os
+# serviços ignorando a capacidade (o "giant tour"), depois corta essa sequência
+# em rotas da melhor forma possível que respeite a capacidade (o "Split").
+
+def construir_giant_tour(g, semente=None, tamanho_rcl=3):
+    """
+    Sequência de códigos orientados com todos os serviços, montada pelo vizinho
+    mais próximo a partir do depósito (mesma escolha gulosa do construtivo, mas sem
+    limite de capacidade). Com 'semente', sorteia entre os 'tamanho_rcl' mais baratos.
+    """
+    servicos = g.servicos
+    rng = random.Random(semente) if semente is not None else None
+    tamanho = tamanho_rcl if rng is not None else 1
+    por_inicio = indexar_por_inicio(servicos)
+    ordem_inicios = OrdemInicios(g)
+    tour = []
+    i_atual = servicos.fim[CODIGO_DEPOSITO]
+    while por_inicio:
+        rcl = _candidatos_rcl(por_inicio, g.linha_indice(i_atual), servicos, math.inf, tamanho,
+                              ordem_inicios.ordem(i_atual, por_inicio))
+        if not rcl:
+            break # Os serviços restantes são inalcançáveis a partir daqui.
+        _, global_id, cod = rng.choice(rcl) if rng is not None else rcl[0]
+        _remover_pendente(por_inicio, global_id, servicos)
+        tour.append(cod)
+        i_atual = servicos.fim[cod]
+    return tour
+
+def dividir_giant_tour(tour, g, capacidade):
+    """
+    SPLIT: divide 'tour' em rotas consecutivas de custo total mínimo, respeitando a
+    capacidade. A ordem e o sentido dos serviços do tour são mantidos.
+
+    Com p[i] = custo ótimo para atender os i primeiros serviços, a rota que atende
+    os serviços i+1..j custa
+        d(depósito, início[i+1]) + custos[i+1..j] + ligações[i+1..j] + d(fim[j], depósito),
+    que separa em uma parte que só depende de i e outra que só depende de j:
+        p[j] = min { f(i) : carga(i+1..j) <= capacidade } + custos[1..j] + ligações[1..j] + d(fim[j], depósito)
+        f(i) = p[i] + d(depósito, início[i+1]) - custos[1..i] - ligações[1..i+1]
+    Como a janela de i viáveis só anda para a frente, o mínimo é mantido com uma
+    fila dupla (deque) crescente em f: cada índice entra e sai uma vez, O(n) no total.
+
+    Retorna a lista de sequências (uma por rota).
+    """
+    n = len(tour)
+    servicos = g.servicos
+    matriz, k, dep = g.matriz, g.k, g.i_deposito
+    inicio, fim = servicos.inicio, servicos.fim
+
+    # Prefixos: custo dos serviços, ligações entre serviços consecutivos e carga.
+    custos = [0.0] * (n + 1)
+    ligacoes = [0.0] * (n + 1) # ligacoes[j]: soma das ligações entre os serviços 1..j
+    carga = [0] * (n + 1)
+    for j in range(1, n + 1):
+        cod = tour[j - 1]
+        custos[j] = custos[j - 1] + servicos.custo[cod >> 1]
+        carga[j] = carga[j - 1] + servicos.demanda[cod >> 1]
+        if j > 1:
+            ligacoes[j] = ligacoes[j - 1] + matriz[fim[tour[j - 2]] * k + inicio[cod]]
+
+    p = [math.inf] * (n + 1)
+    p[0] = 0.0
+    predecessor = [0] * (n + 1)
+    f = [math.inf] * n
+    janela = deque()
+    for j in range(1, n + 1):
+        # O índice i = j - 1 entra na janela; quem tem f maior ou igual sai por trás.
+        i = j - 1
+        if p[i] != math.inf:
+            f[i] = p[i] + matriz[dep * k + inicio[tour[i]]] - custos[i] - ligacoes[i + 1]
+            while janela and f[janela[-1]] >= f[i]:
+                janela.pop()
+            janela.append(i)
+        # Quem não cabe mais na capacidade sai pela frente (e não volta a caber).
+        while janela and carga[j] - carga[janela[0]] > capacidade:
+            janela.popleft()
+        if janela:
+            melhor_i = janela[0]
+            p[j] = f[melhor_i] + custos[j] + ligacoes[j] + matriz[fim[tour[j - 1]] * k + dep]
+            predecessor[j] = melhor_i
+
+    if p[n] == math.inf:
+        raise ValueError("Split sem solução viável: algum serviço tem demanda maior que a capacidade ou é inalcançável.")
+
+    # Reconstrói as rotas andando pelos predecessores a partir do fim.
+    rotas = []
+    j = n
+    while j > 0:
+        i = predecessor[j]
+        rotas.append(tour[i:j])
+        j = i
+    rotas.reverse()
+    return rotas
+
+def gerar_solucao_split(dados, pasta_cache=None, grafo=None, semente=None, tamanho_rcl=3):
+    """
+    Construtivo "rota primeiro, divisão depois": giant tour + Split ótimo.
+    Mesmos parâmetros e mesmo retorno de gerar_solucao_viavel: (rotas, grafo).
+    """
+    with METRICAS.cronometrar("etapa.grafo"):
+        g = grafo if grafo is not None else Grafo(dados, pasta_cache)
+    with METRICAS.cronometrar("etapa.construtivo"):
+        tour = construir_giant_tour(g, semente, tamanho_rcl)
+        if len(tour) < g.servicos.total:
+            print(f"AVISO CRÍTICO ({dados['nome']}): {g.servicos.total - len(tour)} serviços inalcançáveis ficaram fora do giant tour.")
+        rotas = [Rota(seq, g) for seq in dividir_giant_tour(tour, g, dados["capacidade"])]
+    return rotas, g
+
+# Construtivos disponíveis, pelo nome usado na linha de comando.
+CONSTRUTIVOS = {"guloso": gerar_solucao_viavel, "split": gerar_solucao_split}
\ No newline at end of file
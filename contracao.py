@@ -0,0 +1,80 @@
+# contracao.py
+# OBJETIVO: Reduzir o grafo antes de calcular os caminhos mínimos. O solver só
+# precisa das distâncias entre o depósito e as extremidades dos serviços (os
+# "terminais"); os demais vértices só importam como passagem. Em malhas viárias
+# reais a maior parte deles está em cadeias de grau 2 (trechos de rua sem
+# cruzamento) ou em becos sem saída.
+#
+# TÉCNICA (eliminação de vértices): um vértice 'v' que não é terminal é removido
+# e, para cada par de vizinhos u -> v -> w, entra um atalho u -> w com custo
+# c(u, v) + c(v, w) (se for menor que uma ligação u -> w já existente). Todo
+# caminho que passava por 'v' tem um atalho equivalente, então as distâncias
+# entre os vértices que ficam são EXATAMENTE as mesmas.
+# Um vértice só é eliminado quando isso não aumenta o número de ligações
+# (atalhos <= ligações removidas): cadeias de grau 2, becos sem saída e
+# cruzamentos de três vias de mão dupla. Vértices de grau alto ficam.
+
+import math
+
+def contrair_grafo(conexoes, terminais):
+    """
+    Contrai o grafo de 'conexoes' (tuplas (u, v, custo, tipo) como em leitura.py)
+    preservando as distâncias entre os nós de 'terminais'.
+
+    Returns:
+        tuple: (conexoes_contraidas, vertices_removidos), onde as conexões contraídas
+        são tuplas (u, v, custo, "A") de mão única, prontas para dijkstra.construir_csr.
+    """
+    saida = {}   # u -> {v: custo}
+    entrada = {} # v -> {u: custo}
+
+    def ligar(u, v, custo):
+        if u == v or custo >= saida.setdefault(u, {}).get(v, math.inf):
+            return
+        saida[u][v] = custo
+        entrada.setdefault(v, {})[u] = custo
+        saida.setdefault(v, {})
+        entrada.setdefault(u, {})
+
+    for u, v, custo, tipo in conexoes:
+        ligar(u, v, custo)
+        if tipo in ("E", "NE"):
+            ligar(v, u, custo)
+
+    eh_terminal = set(terminais)
+
+    def atalhos(v):
+        """Número de atalhos que a eliminação de 'v' criaria (pares u != w)."""
+        ent, sai = entrada[v], saida[v]
+        return len(ent) * len(sai) - sum(1 for u in ent if u in sai)
+
+    def eliminavel(v):
+        return atalhos(v) <= len(entrada[v]) + len(saida[v])
+
+    pendentes = [v for v in saida if v not in eh_terminal]
+    na_fila = set(pendentes)
+    removidos = 0
+    while pendentes:
+        v = pendentes.pop()
+        na_fila.discard(v)
+        if v not in saida or not eliminavel(v):
+            continue
+
+        ent, sai = entrada.pop(v), saida.pop(v)
+        for u in ent:
+            del saida[u][v]
+        for w in sai:
+            del entrada[w][v]
+        for u, c1 in ent.items():
+            for w, c2 in sai.items():
+                ligar(u, w, c1 + c2)
+        removidos += 1
+
+        # Os vizinhos mudaram de grau e podem ter se tornado elimináveis.
+        for viz in (*ent, *sai):
+            if viz not in eh_terminal and viz not in na_fila and viz in saida:
+                na_fila.add(viz)
+                pendentes.append(viz)
+
+    contraidas = [(u, v, custo, "A") for u, destinos in saida.items() for v, custo in destinos.items()]
+    return contraidas, removidos
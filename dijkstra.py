@@ -1,60 +1,134 @@
 # dijkstra.py
 # OBJETIVO: Este arquivo contém a implementação do algoritmo clássico de Dijkstra.
-# Ele é o motor para encontrar o caminho mais curto entre dois pontos no nosso mapa (grafo).
+# Ele é o motor para encontrar o caminho mais curto entre dois pontos no nosso mapa (grafo),
+# operando sobre a representação compacta (CSR) descrita abaixo.
 
 import heapq  # Usamos heapq para implementar a fila de prioridade, que é essencial para a eficiência do Dijkstra.
 import math   # Usamos math.inf para representar uma distância infinita.
+from array import array # Arrays tipados e contíguos para a representação CSR (ver abaixo).
 
-def dijkstra(num_vertices, adj_list, start_node):
+# --- REPRESENTAÇÃO COMPACTA (CSR) ---
+# Uma lista de adjacência em dicionário e um dicionário de distâncias criado a cada chamada
+# custariam caro em instâncias grandes. A representação CSR (Compressed Sparse Row) guarda
+# o grafo em três arrays contíguos:
+#   - offsets[u] .. offsets[u + 1]: faixa de posições com os vizinhos de 'u';
+#   - destinos[e]: o vizinho na posição 'e';
+#   - pesos[e]: o custo da conexão na posição 'e'.
+
+def construir_csr(num_vertices, conexoes):
     """
-    Executa o algoritmo de Dijkstra a partir de um nó inicial para encontrar
-    as distâncias mais curtas para todos os outros nós no grafo.
+    Constrói a representação CSR a partir de dados["conexoes"].
+
+    Conexões do tipo aresta ("E" e "NE") valem nos dois sentidos. Conexões repetidas
+    entre o mesmo par (u, v) são fundidas, mantendo apenas a de menor custo.
 
     Args:
-        num_vertices (int): O número total de vértices no grafo.
-        adj_list (dict): A lista de adjacência do grafo, onde adj_list[u] = [(v, custo), ...].
-        start_node (int): O nó de onde o cálculo das distâncias deve começar.
+        num_vertices (int): O maior número de nó do grafo.
+        conexoes (list): Lista de tuplas (u, v, custo, tipo), como lida em leitura.py.
 
     Returns:
-        dict: Um dicionário mapeando cada nó à sua distância mais curta a partir do start_node.
+        tuple: (offsets, destinos, pesos), arrays do módulo 'array'.
+    """
+    menor_custo = {}
+    for u, v, custo, tipo in conexoes:
+        if custo < menor_custo.get((u, v), math.inf):
+            menor_custo[(u, v)] = custo
+        if tipo in ("NE", "E") and custo < menor_custo.get((v, u), math.inf):
+            menor_custo[(v, u)] = custo
+
+    # Contagem do grau de saída de cada nó (deslocada em 1) e soma acumulada.
+    graus = [0] * (num_vertices + 2)
+    for u, _ in menor_custo:
+        graus[u + 1] += 1
+    for u in range(1, num_vertices + 2):
+        graus[u] += graus[u - 1]
+    offsets = array('l', graus)
+
+    m = len(menor_custo)
+    destinos = array('l', [0]) * m
+    pesos = array('d', [0.0]) * m
+    proxima_posicao = list(graus)
+    for (u, v), custo in menor_custo.items():
+        p = proxima_posicao[u]
+        destinos[p] = v
+        pesos[p] = custo
+        proxima_posicao[u] = p + 1
+    return offsets, destinos, pesos
+
+
+class DijkstraCSR:
+    """
+    Motor de Dijkstra sobre um grafo CSR. O array de distâncias é alocado uma única vez
+    e reaproveitado entre as origens: a cada execução, só as posições alteradas na
+    execução anterior voltam a ser infinito.
+
+    Também suporta um modo com conjunto de alvos: quando todos os nós marcados em
+    'definir_alvos' já foram fixados (retirados da fila), a busca para.
     """
-    # 1. INICIALIZAÇÃO
-    # Criamos um dicionário para armazenar as distâncias.
-    # Inicialmente, a distância para todos os nós é infinita (math.inf).
-    dist = {i: math.inf for i in range(num_vertices + 1)}
-    
-    # A distância do nó inicial para ele mesmo é sempre 0.
-    dist[start_node] = 0
-    
-    # A fila de prioridade (pq) armazena tuplas de (distância, nó).
-    # Ela sempre nos dará o nó com a menor distância primeiro.
-    # Começamos com o nó de partida.
-    pq = [(0, start_node)]
-
-    # 2. LOOP PRINCIPAL
-    # O algoritmo continua enquanto houver nós na fila de prioridade para serem processados.
-    while pq:
-        # Pega o nó 'u' com a menor distância 'd' da fila. Esta é a escolha "gulosa".
-        d, u = heapq.heappop(pq)
-
-        # OTIMIZAÇÃO: Se a distância 'd' que pegamos da fila for maior que a distância
-        # que já conhecemos para 'u', significa que já encontramos um caminho mais curto antes.
-        # Então, simplesmente ignoramos e continuamos.
-        if d > dist[u]:
-            continue
-
-        # 3. RELAXAMENTO (O CORAÇÃO DO ALGORITMO)
-        # Para cada vizinho 'v' do nó 'u' que acabamos de pegar...
-        if u in adj_list:
-            for v, weight in adj_list[u]:
-                # Verificamos se o caminho através de 'u' é mais curto do que o caminho que conhecíamos para 'v'.
-                # Ou seja, se (distância até u) + (custo de u para v) < (distância atual até v)
-                if dist[u] + weight < dist[v]:
-                    # Se for, encontramos um caminho melhor!
-                    # Atualizamos a distância de 'v'.
-                    dist[v] = dist[u] + weight
-                    # E adicionamos 'v' à fila de prioridade com sua nova distância menor.
-                    heapq.heappush(pq, (dist[v], v))
-    
-    # Ao final, o dicionário 'dist' contém as menores distâncias de 'start_node' para todos os outros.
-    return dist
\ No newline at end of file
+    def __init__(self, num_vertices, offsets, destinos, pesos):
+        self.offsets = offsets
+        self.destinos = destinos
+        self.pesos = pesos
+        self.dist = array('d', [math.inf]) * (num_vertices + 1)
+        self._tocados = []
+        self._eh_alvo = bytearray(num_vertices + 1)
+        self._num_alvos = 0
+
+    def definir_alvos(self, nos):
+        """
+        Marca os nós cujas distâncias interessam no modo 'somente_alvos'.
+        """
+        self._eh_alvo = bytearray(len(self.dist))
+        for no in nos:
+            self._eh_alvo[no] = 1
+        self._num_alvos = sum(self._eh_alvo)
+
+    def executar(self, start_node, somente_alvos=False):
+        """
+        Calcula as menores distâncias a partir de 'start_node'.
+
+        Args:
+            start_node (int): O nó de origem.
+            somente_alvos (bool): Se True, para assim que todos os alvos definidos em
+                'definir_alvos' forem fixados. Nesse caso, apenas as distâncias dos alvos
+                são garantidamente finais; as dos demais nós podem estar superestimadas.
+
+        Returns:
+            array: O array interno 'dist', indexado pelo número do nó. Ele é sobrescrito
+            na próxima chamada, então quem precisar guardar o resultado deve copiá-lo.
+        """
+        dist = self.dist
+        offsets, destinos, pesos = self.offsets, self.destinos, self.pesos
+        inf = math.inf
+
+        # Desfaz apenas o que a execução anterior alterou.
+        for no in self._tocados:
+            dist[no] = inf
+        tocados = [start_node]
+        dist[start_node] = 0.0
+
+        eh_alvo = self._eh_alvo
+        restantes = self._num_alvos if somente_alvos else -1
+
+        pq = [(0.0, start_node)]
+        heappop, heappush = heapq.heappop, heapq.heappush
+        while pq:
+            d, u = heappop(pq)
+            if d > dist[u]:
+                continue
+            # PARADA ANTECIPADA: 'u' acabou de ser fixado; se era o último alvo, terminamos.
+            if eh_alvo[u]:
+                restantes -= 1
+                if restantes == 0:
+                    break
+            for e in range(offsets[u], offsets[u + 1]):
+                nd = d + pesos[e]
+                v = destinos[e]
+                if nd < dist[v]:
+                    if dist[v] == inf:
+                        tocados.append(v)
+                    dist[v] = nd
+                    heappush(pq, (nd, v))
+
+        self._tocados = tocados
+        return dist
@@ -0,0 +1,142 @@
+# gerador_instancias.py
+# OBJETIVO: Gerar instâncias sintéticas do CARP/MCARP no mesmo formato .dat que
+# o leitura.py lê, para medir o desempenho do solver em tamanhos que as
+# instâncias da pasta Ins não cobrem (de centenas a dezenas de milhares de nós).
+#
+# A geração é determinística: a mesma semente e os mesmos parâmetros produzem
+# sempre o mesmo arquivo, então os tempos do benchmark são comparáveis entre
+# execuções (ver benchmark.py).
+#
+# TOPOLOGIA: os nós formam uma grade (largura ~ raiz de n) ligada por arestas,
+# o que garante um grafo conexo nos dois sentidos. Por cima da grade são
+# sorteados arcos curtos (atalhos de mão única). Os serviços requeridos são
+# sorteados entre os nós (ReN), as arestas da grade (ReE) e os arcos (ReA).
+# Com 'subdivisoes', cada aresta NÃO requerida da grade vira uma cadeia de nós
+# de grau 2, como os trechos de rua sem cruzamento de uma malha viária real.
+
+import argparse
+import math
+import random
+
+def gerar_instancia(caminho, num_nos, num_servicos, semente=0, capacidade=100,
+                    proporcao=(0.2, 0.4, 0.4), subdivisoes=0):
+    """
+    Gera uma instância sintética e grava em 'caminho'.
+
+    Args:
+        caminho (str): arquivo .dat de saída.
+        num_nos (int): número de nós do grafo.
+        num_servicos (int): total de serviços requeridos (nós + arestas + arcos).
+        semente (int): semente do gerador pseudoaleatório.
+        capacidade (int): capacidade do veículo (demandas vão de 1 a 10).
+        proporcao (tuple): frações de nós, arestas e arcos entre os serviços.
+        subdivisoes (int): nós intermediários inseridos em cada aresta não requerida.
+
+    Returns:
+        dict: resumo da instância gerada (quantidades de cada bloco).
+    """
+    rng = random.Random(semente)
+    largura = max(2, math.isqrt(num_nos))
+
+    # 1. GRADE DE ARESTAS (garante que todo nó alcança todos os outros)
+    arestas = []
+    for no in range(1, num_nos + 1):
+        coluna = (no - 1) % largura
+        if coluna + 1 < largura and no + 1 <= num_nos:
+            arestas.append((no, no + 1, rng.randint(1, 20)))
+        if no + largura <= num_nos:
+            arestas.append((no, no + largura, rng.randint(1, 20)))
+
+    # 2. ARCOS CURTOS (atalhos de mão única entre nós próximos na grade)
+    saltos = (2, largura - 1, largura + 1, 2 * largura)
+    arcos = []
+    for _ in range(num_nos // 2):
+        u = rng.randint(1, num_nos)
+        v = u + rng.choice(saltos) * rng.choice((-1, 1))
+        if 1 <= v <= num_nos and v != u:
+            arcos.append((u, v, rng.randint(1, 30)))
+
+    # 3. SORTEIO DOS SERVIÇOS REQUERIDOS
+    n_nos = min(num_nos, int(num_servicos * proporcao[0]))
+    n_arestas = min(len(arestas), int(num_servicos * proporcao[1]))
+    n_arcos = min(len(arcos), num_servicos - n_nos - n_arestas)
+    nos_req = sorted(rng.sample(range(1, num_nos + 1), n_nos))
+    idx_arestas = set(rng.sample(range(len(arestas)), n_arestas))
+    idx_arcos = set(rng.sample(range(len(arcos)), n_arcos))
+
+    # 4. CADEIAS DE GRAU 2 (opcional): os nós intermediários vêm depois dos da grade.
+    nao_requeridas = []
+    total_nos = num_nos
+    for i, (u, v, custo) in enumerate(arestas):
+        if i in idx_arestas:
+            continue
+        anterior = u
+        for _ in range(subdivisoes):
+            total_nos += 1
+            nao_requeridas.append((anterior, total_nos, custo))
+            anterior = total_nos
+        nao_requeridas.append((anterior, v, custo))
+
+    linhas = [
+        f"Name:\t\tSINT-{num_nos}-{num_servicos}-{semente}",
+        "Optimal value:\t-1",
+        "#Vehicles:\t-1",
+        f"Capacity:\t{capacidade}",
+        "Depot Node:\t1",
+        f"#Nodes:\t\t{total_nos}",
+        f"#Edges:\t\t{n_arestas + len(nao_requeridas)}",
+        f"#Arcs:\t\t{len(arcos)}",
+        f"#Required N:\t{n_nos}",
+        f"#Required E:\t{n_arestas}",
+        f"#Required A:\t{n_arcos}",
+        "",
+        "ReN.\tDEMAND\tS. COST",
+    ]
+    for no in nos_req:
+        linhas.append(f"N{no}\t{rng.randint(1, 10)}\t{rng.randint(1, 5)}")
+
+    # Serviços em arestas/arcos: custo de serviço igual ao de travessia, como nas instâncias originais.
+    linhas += ["", "ReE.\tFrom N.\tTo N.\tT. COST\tDEMAND\tS. COST"]
+    sid = 1
+    for i, (u, v, custo) in enumerate(arestas):
+        if i in idx_arestas:
+            linhas.append(f"E{sid}\t{u}\t{v}\t{custo}\t{rng.randint(1, 10)}\t{custo}")
+            sid += 1
+    linhas += ["", "EDGE\tFROM N.\tTO N.\tT. COST"]
+    linhas += [f"NrE{i}\t{u}\t{v}\t{custo}" for i, (u, v, custo) in enumerate(nao_requeridas, 1)]
+
+    linhas += ["", "ReA.\tFROM N.\tTO N.\tT. COST\tDEMAND\tS. COST"]
+    nao_requeridos = []
+    sid = 1
+    for i, (u, v, custo) in enumerate(arcos):
+        if i in idx_arcos:
+            linhas.append(f"A{sid}\t{u}\t{v}\t{custo}\t{rng.randint(1, 10)}\t{custo}")
+            sid += 1
+        else:
+            nao_requeridos.append((u, v, custo))
+    linhas += ["", "ARC\tFROM N.\tTO N.\tT. COST"]
+    linhas += [f"NrA{i}\t{u}\t{v}\t{custo}" for i, (u, v, custo) in enumerate(nao_requeridos, 1)]
+    linhas += ["", "END"]
+
+    with open(caminho, "w", encoding="utf-8") as f:
+        f.write("\n".join(linhas) + "\n")
+
+    return {"nos": total_nos, "arestas": n_arestas + len(nao_requeridas), "arcos": len(arcos),
+            "ReN": n_nos, "ReE": n_arestas, "ReA": n_arcos}
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera uma instância sintética no formato .dat.")
+    parser.add_argument("saida", help="Arquivo .dat de saída.")
+    parser.add_argument("--nos", type=int, required=True, help="Número de nós do grafo.")
+    parser.add_argument("--servicos", type=int, required=True, help="Total de serviços requeridos.")
+    parser.add_argument("--semente", type=int, default=0, help="Semente do gerador (padrão: 0).")
+    parser.add_argument("--capacidade", type=int, default=100, help="Capacidade do veículo (padrão: 100).")
+    parser.add_argument("--subdivisoes", type=int, default=0, help="Nós de grau 2 em cada aresta não requerida (padrão: 0).")
+    args = parser.parse_args()
+
+    resumo = gerar_instancia(args.saida, args.nos, args.servicos, args.semente, args.capacidade,
+                             subdivisoes=args.subdivisoes)
+    print(f"Instância gerada em {args.saida}: {resumo}")
+
+if __name__ == "__main__":
+    main()
@@ -4,17 +4,55 @@
 # usando o algoritmo de Dijkstra e uma otimização de cache.
 
 import math
-from dijkstra import dijkstra # Importamos nossa implementação do Dijkstra.
+import mmap
+import tempfile
+import time
+from array import array
+from operator import itemgetter
+from dijkstra import construir_csr, DijkstraCSR # Importamos nossa implementação do Dijkstra (versão CSR).
+from contracao import contrair_grafo
+from cache_memoria import CacheLRU
+from cache_disco import hash_instancia, carregar_matriz, salvar_matriz, salvar_linhas
+from modelo import Servicos
+from metricas import METRICAS
+
+def nos_de_servico(dados):
+    """
+    Retorna a lista ordenada dos nós que o solver realmente consulta:
+    o depósito e as extremidades de todos os nós, arestas e arcos requeridos.
+    """
+    reqs = dados["requisitos"]
+    nos = {dados["deposito"]}
+    for s_list in (reqs["nos"], reqs["arestas"], reqs["arcos"]):
+        for s in s_list:
+            nos.add(s["u"])
+            nos.add(s["v"])
+    return sorted(nos)
 
 class Grafo:
     """
     Esta classe encapsula a representação do grafo e gerencia o cálculo de distâncias.
     A principal funcionalidade é o cache de distâncias para evitar recálculos desnecessários.
     """
-    def __init__(self, dados):
+    def __init__(self, dados, pasta_cache=None, contrair=True, max_cache_entradas=None, max_cache_bytes=None):
         """
         O construtor da classe. Ele pega os dados lidos do arquivo de instância
-        e constrói a estrutura do grafo (uma lista de adjacência).
+        e constrói a estrutura do grafo (uma lista de adjacência compacta, em formato CSR).
+
+        Se 'pasta_cache' for informada, a matriz de distâncias é lida do cache em disco
+        (ver cache_disco.py) quando a mesma instância já foi resolvida antes, e gravada
+        lá caso contrário.
+
+        Com 'contrair' (padrão), a matriz é calculada sobre o grafo contraído aos nós
+        de serviço (ver contracao.py), que dá as mesmas distâncias com menos vértices.
+
+        'max_cache_entradas' e 'max_cache_bytes' limitam o cache de distâncias completas
+        (ver obter_distancias), usado só para nós fora da matriz; sem eles, o cache
+        cresce sem limite. 'max_cache_bytes' também vale para a matriz densa, que é a
+        que o solver usa: se os 8*k*k bytes dela passarem do limite, ela é montada
+        linha a linha em disco (no cache em disco ou em um arquivo temporário) e
+        mapeada em memória (mmap), e o sistema operacional mantém carregadas só as
+        páginas em uso.
         """
         n_header = dados["num_vertices"]
         self.n = n_header
@@ -23,80 +61,175 @@ class Grafo:
         if dados["conexoes"]:
             max_node_in_conns = max(max(u, v) for u, v, _, _ in dados["conexoes"])
         
-        self.n = max(self.n, max_node_in_conns)
+        self.nos_matriz = nos_de_servico(dados)
+        self.n = max(self.n, max_node_in_conns, self.nos_matriz[-1])
         
-        # A lista de adjacência 'adj' é um dicionário onde a chave é um nó
-        # e o valor é uma lista de tuplas (vizinho, custo).
-        self.adj = {} 
-        for u, v, custo, tipo in dados["conexoes"]:
-            if u not in self.adj: self.adj[u] = []
-            if v not in self.adj: self.adj[v] = []
-            
-            self.adj[u].append((v, custo))
-            # Para arestas (não direcionadas), a conexão existe nos dois sentidos.
-            if tipo in ("NE", "E"):
-                self.adj[v].append((u, custo))
+        # O grafo completo, em formato CSR (offsets/destinos/pesos), e o seu motor de
+        # Dijkstra só são montados se alguém pedir distâncias a partir de um nó fora
+        # da matriz (ver obter_distancias). A matriz usa o grafo contraído.
+        self._conexoes = dados["conexoes"]
+        self.contrair = contrair
+        self._motor = None
         
         # OTIMIZAÇÃO: Mecanismo de cache para evitar recalcular Dijkstra.
-        # Chave: nó de origem. Valor: dicionário de distâncias a partir dessa origem.
+        # Chave: nó de origem. Valor: array de distâncias a partir dessa origem (indexado pelo nó).
         # Isso acelera drasticamente o algoritmo, pois muitas vezes precisamos
         # das distâncias a partir do mesmo ponto várias vezes.
-        self.cache_distancias = {}
+        # Com limite, as origens usadas há mais tempo são descartadas (LRU, ver cache_memoria.py).
+        self.cache_distancias = CacheLRU(max_cache_entradas, max_cache_bytes)
+
+        # OTIMIZAÇÃO: Matriz densa de distâncias restrita aos nós de serviço.
+        # Todas as posições que um veículo ocupa (depósito e extremidades dos serviços)
+        # estão neste conjunto, então a busca local nunca precisa do cache por dicionário.
+        # 'indice' traduz o número do nó para a linha/coluna da matriz, e a distância
+        # de i para j fica em matriz[i * k + j] (um array('d') contíguo, sem objetos float).
+        self.indice = {no: i for i, no in enumerate(self.nos_matriz)}
+        self.k = len(self.nos_matriz)
+        self.i_deposito = self.indice[dados["deposito"]]
+        self._em_disco = max_cache_bytes is not None and 8 * self.k * self.k > max_cache_bytes
+        self._arquivo_matriz = None
+        self.matriz = self._obter_matriz(dados, pasta_cache)
+
+        # Serviços requeridos em arrays paralelos, já com os índices da matriz
+        # de cada extremidade (ver modelo.py).
+        self.servicos = Servicos(dados, self.indice)
+
+    def _obter_matriz(self, dados, pasta_cache):
+        """
+        Reaproveita a matriz do cache em disco (mapeada em memória, sem cópia) ou,
+        se não houver, calcula-a e grava no cache.
+        """
+        if self._em_disco:
+            METRICAS.contar("matriz.em_disco")
+        if pasta_cache is None:
+            return self._matriz_temporaria() if self._em_disco else self._construir_matriz()
+
+        chave = hash_instancia(dados, self.nos_matriz)
+        carregado = carregar_matriz(pasta_cache, chave)
+        if carregado is not None and carregado[0] == self.nos_matriz:
+            METRICAS.contar("cache_disco.acertos")
+            return carregado[1]
+
+        METRICAS.contar("cache_disco.falhas")
+        if self._em_disco:
+            # As linhas vão direto para o cache, e a matriz é usada a partir do arquivo.
+            try:
+                salvar_linhas(pasta_cache, chave, self.nos_matriz, self._linhas_matriz())
+                return carregar_matriz(pasta_cache, chave)[1]
+            except OSError as e:
+                print(f"AVISO: não foi possível gravar o cache de distâncias: {e}")
+                return self._matriz_temporaria()
+        matriz = self._construir_matriz()
+        try:
+            salvar_matriz(pasta_cache, chave, self.nos_matriz, matriz)
+        except OSError as e:
+            print(f"AVISO: não foi possível gravar o cache de distâncias: {e}")
+        return matriz
+
+    def _construir_matriz(self):
+        """Monta a matriz em memória, um array('d') com as linhas de _linhas_matriz."""
+        k = self.k
+        matriz = array('d', [math.inf]) * (k * k)
+        for i, linha in enumerate(self._linhas_matriz()):
+            matriz[i * k:(i + 1) * k] = linha
+        return matriz
+
+    def _matriz_temporaria(self):
+        """
+        Monta a matriz linha a linha em um arquivo temporário (apagado ao fechar) e
+        retorna a visão dela mapeada em memória. O arquivo fica aberto enquanto o
+        Grafo existir.
+        """
+        self._arquivo_matriz = tempfile.TemporaryFile(prefix="carp-matriz-")
+        for linha in self._linhas_matriz():
+            linha.tofile(self._arquivo_matriz)
+        self._arquivo_matriz.flush()
+        return memoryview(mmap.mmap(self._arquivo_matriz.fileno(), 0, access=mmap.ACCESS_READ)).cast('d')
+
+    def _linhas_matriz(self):
+        """
+        Executa o Dijkstra uma vez a partir de cada nó de serviço e gera, na ordem de
+        'nos_matriz', a linha da matriz (array('d') só com as colunas dos nós de
+        serviço). As distâncias completas não são guardadas.
+        Cada busca para assim que todos os nós de serviço foram fixados, sem explorar
+        o restante do grafo.
+        """
+        k = self.k
+        conexoes = self._conexoes
+        if self.contrair:
+            # OTIMIZAÇÃO: remove os vértices de passagem (cadeias de grau 2, becos etc.)
+            # trocando-os por atalhos; as distâncias entre nós de serviço não mudam.
+            with METRICAS.cronometrar("contracao"):
+                conexoes, removidos = contrair_grafo(conexoes, self.nos_matriz)
+            METRICAS.contar("contracao.vertices_removidos", removidos)
+            METRICAS.contar("contracao.ligacoes", len(conexoes))
+        motor = DijkstraCSR(self.n, *construir_csr(self.n, conexoes))
+        motor.definir_alvos(self.nos_matriz)
+        # itemgetter extrai as k colunas de uma vez (em C); com k == 1 ele devolve um escalar.
+        colunas = itemgetter(*self.nos_matriz) if k > 1 else (lambda dist: (dist[self.nos_matriz[0]],))
+        tempo = 0.0
+        for origem in self.nos_matriz:
+            inicio = time.perf_counter()
+            linha = array('d', colunas(motor.executar(origem, somente_alvos=True)))
+            tempo += time.perf_counter() - inicio
+            yield linha
+        METRICAS.contar("dijkstra.chamadas", k)
+        METRICAS.adicionar_tempo("dijkstra", tempo)
+
+    def linha(self, no_origem):
+        """
+        Retorna a linha da matriz com as distâncias de 'no_origem' para os nós de serviço,
+        indexada pela posição em 'self.indice' (sem cópia).
+        """
+        return self.linha_indice(self.indice[no_origem])
+
+    def linha_indice(self, i):
+        """Como linha(), mas a partir do índice 'i' na matriz (ex.: servicos.fim[cod])."""
+        return memoryview(self.matriz)[i * self.k:(i + 1) * self.k]
+
+    def distancia(self, u, v):
+        """
+        Distância do nó 'u' ao nó 'v'. Consulta O(1) na matriz quando ambos são nós de
+        serviço; caso contrário, recorre ao Dijkstra com cache.
+        """
+        i = self.indice.get(u)
+        j = self.indice.get(v)
+        if i is not None and j is not None:
+            return self.matriz[i * self.k + j]
+        distancias = self.obter_distancias(u)
+        return distancias[v] if 0 <= v <= self.n else math.inf
 
     def obter_distancias(self, no_origem):
         """
-        Retorna um dicionário com as distâncias de 'no_origem' para todos os outros nós.
+        Retorna um array com as distâncias de 'no_origem' para todos os outros nós
+        (a posição 'v' guarda a distância até o nó 'v').
         Esta função é o ponto central de consulta de distâncias.
         """
         # 1. VERIFICA O CACHE
         # Se já calculamos as distâncias para este 'no_origem' antes,
         # simplesmente retornamos o resultado armazenado.
-        if no_origem in self.cache_distancias:
-            return self.cache_distancias[no_origem]
+        distancias = self.cache_distancias.obter(no_origem)
+        if distancias is not None:
+            METRICAS.contar("cache_distancias.acertos")
+            return distancias
         
         # 2. CALCULA (SE NÃO ESTIVER NO CACHE)
         # Caso contrário, chamamos o algoritmo de Dijkstra para fazer o cálculo.
-        distancias = dijkstra(self.n, self.adj, no_origem)
+        # O motor reaproveita o próprio array, então guardamos uma cópia.
+        METRICAS.contar("cache_distancias.falhas")
+        if self._motor is None:
+            # Motor de Dijkstra do grafo completo, com o array de distâncias reaproveitado.
+            self._motor = DijkstraCSR(self.n, *construir_csr(self.n, self._conexoes))
+        inicio = time.perf_counter()
+        distancias = array('d', self._motor.executar(no_origem))
+        METRICAS.contar("dijkstra.chamadas")
+        METRICAS.adicionar_tempo("dijkstra", time.perf_counter() - inicio)
         
         # 3. ARMAZENA NO CACHE
         # Guardamos o resultado no cache para que, na próxima vez, a resposta seja instantânea.
-        self.cache_distancias[no_origem] = distancias
+        # Se o cache tiver limite, a origem usada há mais tempo pode sair para dar lugar a esta.
+        remocoes = self.cache_distancias.remocoes
+        self.cache_distancias.guardar(no_origem, distancias)
+        if self.cache_distancias.remocoes != remocoes:
+            METRICAS.contar("cache_distancias.remocoes", self.cache_distancias.remocoes - remocoes)
         return distancias
-
-def calcular_custo_rota(sequencia_servicos, grafo, deposito):
-    """
-    Calcula o custo total de uma rota específica. Uma rota é uma sequência de serviços.
-    """
-    if not sequencia_servicos:
-        return 0.0
-
-    custo_total = 0.0
-    pos_atual = deposito # A rota sempre começa no depósito.
-
-    # Itera sobre cada serviço na sequência da rota.
-    for servico in sequencia_servicos:
-        _, p1, p2, _, s_custo, t_custo = servico # Desempacota as informações do serviço.
-        
-        # Pega as distâncias do ponto atual para todos os outros.
-        distancias_do_ponto_atual = grafo.obter_distancias(pos_atual)
-        # O custo de viagem é o caminho mais curto de 'pos_atual' até 'p1' (início do serviço).
-        custo_viagem = distancias_do_ponto_atual.get(p1, math.inf)
-
-        if custo_viagem == math.inf: return math.inf # Se for inf, a rota é inviável.
-
-        # Acumula os custos: custo da viagem + custo de travessia do serviço + custo de serviço.
-        custo_total += custo_viagem
-        custo_total += t_custo
-        custo_total += s_custo
-        
-        # Atualiza a posição atual do veículo para o final do serviço ('p2').
-        pos_atual = p2
-
-    # Após o último serviço, calcula o custo de volta para o depósito.
-    distancias_finais = grafo.obter_distancias(pos_atual)
-    custo_volta = distancias_finais.get(deposito, math.inf)
-
-    if custo_volta == math.inf: return math.inf
-
-    custo_total += custo_volta
-    return custo_total
\ No newline at end of file
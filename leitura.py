@@ -2,24 +2,31 @@
 # OBJETIVO: Este arquivo é responsável por ler os arquivos de instância (.dat),
 # que contêm a descrição do problema (mapa, serviços, capacidade do veículo, etc.),
 # e carregar esses dados em uma estrutura de dicionário Python para fácil acesso.
+#
+# Também oferece um formato binário compilado (.carpbin): depois da primeira leitura,
+# os serviços e conexões são gravados como arrays tipados, e as leituras seguintes
+# da mesma instância pulam a análise do texto (ver carregar_instancia).
 
 import os
+import struct
+import sys
+from array import array
 
 def ler_instancia_completa(caminho):
     """
     Função principal que lê um arquivo de instância do CARP, linha por linha,
     e o transforma em um dicionário Python estruturado.
 
+    A leitura é feita em uma única passada pelo arquivo: cada linha é convertida
+    para maiúsculas e dividida em partes uma só vez, e uma variável de estado
+    ('bloco') indica em qual bloco de dados estamos.
+
     Args:
         caminho (str): O caminho completo para o arquivo .dat da instância.
 
     Returns:
         dict: Um dicionário contendo todos os dados da instância.
     """
-    with open(caminho, "r", encoding="utf-8") as f:
-        # Lê todas as linhas do arquivo, removendo espaços em branco e linhas vazias.
-        linhas = [l.strip() for l in f if l.strip()]
-
     # Estrutura de dados principal para armazenar as informações da instância.
     # É inicializada com valores padrão.
     dados = {
@@ -35,11 +42,8 @@ def ler_instancia_completa(caminho):
         },
         "conexoes": []
     }
-
-    # Função auxiliar para identificar linhas de cabeçalho que devem ser ignoradas.
-    def is_header(l):
-        h = l.upper()
-        return ("DEMAND" in h or "S. COST" in h or "FROM" in h or "TO" in h or "T. COST" in h or "COST" in h)
+    nos, arestas, arcos = dados["requisitos"]["nos"], dados["requisitos"]["arestas"], dados["requisitos"]["arcos"]
+    conexoes = dados["conexoes"]
 
     # Função auxiliar para tentar extrair uma conexão (u, v, custo) de uma linha.
     def try_parse_connection(line_parts):
@@ -51,104 +55,186 @@ def ler_instancia_completa(caminho):
         except (IndexError, ValueError):
             return None, None, None
 
-    # Loop principal para percorrer o arquivo linha por linha.
-    i = 0
-    while i < len(linhas):
-        linha = linhas[i]
-        lstr = linha.strip().upper()
-
-        # --- PARTE 1: Leitura do Cabeçalho (Informações Gerais) ---
-        # Cada 'if' aqui procura por uma palavra-chave para identificar a informação.
-        if "OPTIMAL VALUE" in lstr: i+=1; continue # Ignora o valor ótimo
-        elif "CAPACITY" in lstr: dados["capacidade"] = int(linha.split(":")[1].strip()); i+=1; continue
-        elif "DEPOT NODE" in lstr: dados["deposito"] = int(linha.split(":")[1].strip()); i+=1; continue
-        elif "#NODES" in lstr: dados["num_vertices"] = int(linha.split(":")[1].replace('\t','').strip()); i+=1; continue
-        # Ignora outras informações não utilizadas no nosso modelo.
-        elif "#VEHICLES" in lstr: i+=1; continue
-        elif "#EDGES" in lstr: i+=1; continue
-        elif "#ARCS" in lstr: i+=1; continue
-        elif "#REQUIRED" in lstr: i+=1; continue
-        elif "NAME:" in lstr: i+=1; continue
-
-        # --- PARTE 2: Leitura dos Serviços Requeridos ---
-        # Esta seção identifica blocos de serviços (Nós, Arestas, Arcos).
-        
-        # Bloco de Nós Requeridos (Required Nodes)
-        elif lstr.startswith("REN."):
-            i += 1
-            while i < len(linhas):
-                l = linhas[i]
-                if not l or not l.strip().upper().startswith("N") or is_header(l): break
-                try:
-                    partes = l.split(); sid = int(partes[0][1:]); d = int(partes[1]); sc = int(partes[2])
-                    dados["requisitos"]["nos"].append({"id": sid, "u": sid, "v": sid, "demanda": d, "s_custo": sc, "t_custo": 0})
-                except Exception as e: print(f"AVISO Leitura ReN: '{l}' - {e}")
-                i += 1
-            continue
-        
-        # Bloco de Arestas Requeridas (Required Edges)
-        elif lstr.startswith("REE."):
-            i += 1
-            while i < len(linhas):
-                l = linhas[i]
-                if not l or not l.strip().upper().startswith("E") or is_header(l): break
-                try:
-                    partes = l.split(); sid = int(partes[0][1:]); u = int(partes[1]); v = int(partes[2]); tc = int(partes[3]); d = int(partes[4]); sc = int(partes[5])
-                    dados["requisitos"]["arestas"].append({"id": sid, "u": u, "v": v, "demanda": d, "s_custo": sc, "t_custo": tc})
-                    # Uma aresta requerida também é uma conexão no grafo. Adicionamos nos dois sentidos.
-                    dados["conexoes"].append((u, v, tc, "E")); dados["conexoes"].append((v, u, tc, "E"))
-                except Exception as e: print(f"AVISO Leitura ReE: '{l}' - {e}")
-                i += 1
-            continue
-
-        # Bloco de Arcos Requeridos (Required Arcs)
-        elif lstr.startswith("REA."):
-            i += 1
-            while i < len(linhas):
-                l = linhas[i]
-                if not l or not l.strip().upper().startswith("A") or is_header(l): break
-                try:
-                    partes = l.split(); sid = int(partes[0][1:]); u = int(partes[1]); v = int(partes[2]); tc = int(partes[3]); d = int(partes[4]); sc = int(partes[5])
-                    dados["requisitos"]["arcos"].append({"id": sid, "u": u, "v": v, "demanda": d, "s_custo": sc, "t_custo": tc})
-                    # Um arco requerido é uma conexão de mão única.
-                    dados["conexoes"].append((u, v, tc, "A"))
-                except Exception as e: print(f"AVISO Leitura ReA: '{l}' - {e}")
-                i += 1
-            continue
-
-        # --- PARTE 3: Leitura da Topologia do Grafo (Conexões não requeridas) ---
-        
-        # Bloco de Arestas Não-Requeridas (Non-required Edges)
-        elif lstr.startswith("EDGE"):
-            i += 1
-            while i < len(linhas):
-                l = linhas[i]
-                if not l or is_header(l) or l.upper().startswith("ARC"): break
-                partes = l.split()
-                u, v, custo = try_parse_connection(partes)
-                if u is not None:
-                    # Adiciona a conexão nos dois sentidos, pois é uma aresta.
-                    dados["conexoes"].append((u, v, custo, "NE"))
-                    dados["conexoes"].append((v, u, custo, "NE"))
-                else: pass
-                i += 1
-            continue
-
-        # Bloco de Arcos Não-Requeridos (Non-required Arcs)
-        elif lstr.startswith("ARC"):
-            i += 1
-            while i < len(linhas):
-                l = linhas[i]
-                if not l or is_header(l) or l.upper().startswith("END"): break
-                partes = l.split()
-                u, v, custo = try_parse_connection(partes)
-                if u is not None:
-                    # Adiciona a conexão em sentido único, pois é um arco.
-                    dados["conexoes"].append((u, v, custo, "NA"))
-                else: pass
-                i += 1
-            continue
-
-        # Avança para a próxima linha se nenhuma das condições acima for atendida.
-        i += 1
+    # Bloco atual: None (cabeçalho geral), "REN", "REE", "REA", "EDGE" ou "ARC".
+    bloco = None
+
+    with open(caminho, "r", encoding="utf-8") as f:
+        for linha in f:
+            linha = linha.strip()
+            if not linha: continue
+            lstr = linha.upper()
+
+            # --- LINHAS DE DADOS DO BLOCO ATUAL ---
+            # Se a linha não pertence mais ao bloco, o bloco termina e ela é
+            # tratada logo abaixo como uma linha de cabeçalho.
+            if bloco is not None:
+                # Linha de cabeçalho (títulos das colunas: DEMAND, S. COST, FROM, TO, T. COST...).
+                cabecalho = "DEMAND" in lstr or "COST" in lstr or "FROM" in lstr or "TO" in lstr
+                if bloco == "REN" and lstr.startswith("N") and not cabecalho:
+                    # Bloco de Nós Requeridos (Required Nodes)
+                    try:
+                        partes = linha.split(); sid = int(partes[0][1:]); d = int(partes[1]); sc = int(partes[2])
+                        nos.append({"id": sid, "u": sid, "v": sid, "demanda": d, "s_custo": sc, "t_custo": 0})
+                    except Exception as e: print(f"AVISO Leitura ReN: '{linha}' - {e}")
+                    continue
+                if bloco == "REE" and lstr.startswith("E") and not cabecalho:
+                    # Bloco de Arestas Requeridas (Required Edges)
+                    try:
+                        partes = linha.split(); sid = int(partes[0][1:]); u = int(partes[1]); v = int(partes[2]); tc = int(partes[3]); d = int(partes[4]); sc = int(partes[5])
+                        arestas.append({"id": sid, "u": u, "v": v, "demanda": d, "s_custo": sc, "t_custo": tc})
+                        # Uma aresta requerida também é uma conexão no grafo. Adicionamos nos dois sentidos.
+                        conexoes.append((u, v, tc, "E")); conexoes.append((v, u, tc, "E"))
+                    except Exception as e: print(f"AVISO Leitura ReE: '{linha}' - {e}")
+                    continue
+                if bloco == "REA" and lstr.startswith("A") and not cabecalho:
+                    # Bloco de Arcos Requeridos (Required Arcs)
+                    try:
+                        partes = linha.split(); sid = int(partes[0][1:]); u = int(partes[1]); v = int(partes[2]); tc = int(partes[3]); d = int(partes[4]); sc = int(partes[5])
+                        arcos.append({"id": sid, "u": u, "v": v, "demanda": d, "s_custo": sc, "t_custo": tc})
+                        # Um arco requerido é uma conexão de mão única.
+                        conexoes.append((u, v, tc, "A"))
+                    except Exception as e: print(f"AVISO Leitura ReA: '{linha}' - {e}")
+                    continue
+                if bloco == "EDGE" and not cabecalho and not lstr.startswith("ARC"):
+                    # Bloco de Arestas Não-Requeridas: conexão nos dois sentidos.
+                    u, v, custo = try_parse_connection(linha.split())
+                    if u is not None:
+                        conexoes.append((u, v, custo, "NE"))
+                        conexoes.append((v, u, custo, "NE"))
+                    continue
+                if bloco == "ARC" and not cabecalho and not lstr.startswith("END"):
+                    # Bloco de Arcos Não-Requeridos: conexão em sentido único.
+                    u, v, custo = try_parse_connection(linha.split())
+                    if u is not None:
+                        conexoes.append((u, v, custo, "NA"))
+                    continue
+                bloco = None
+
+            # --- PARTE 1: Leitura do Cabeçalho (Informações Gerais) ---
+            # Cada 'if' aqui procura por uma palavra-chave para identificar a informação.
+            if "OPTIMAL VALUE" in lstr: continue # Ignora o valor ótimo
+            elif "CAPACITY" in lstr: dados["capacidade"] = int(linha.split(":")[1].strip())
+            elif "DEPOT NODE" in lstr: dados["deposito"] = int(linha.split(":")[1].strip())
+            elif "#NODES" in lstr: dados["num_vertices"] = int(linha.split(":")[1].replace('\t','').strip())
+            # Ignora outras informações não utilizadas no nosso modelo.
+            elif "#VEHICLES" in lstr or "#EDGES" in lstr or "#ARCS" in lstr or "#REQUIRED" in lstr or "NAME:" in lstr: continue
+
+            # --- PARTE 2: Início dos blocos de Serviços Requeridos (Nós, Arestas, Arcos) ---
+            elif lstr.startswith("REN."): bloco = "REN"
+            elif lstr.startswith("REE."): bloco = "REE"
+            elif lstr.startswith("REA."): bloco = "REA"
+
+            # --- PARTE 3: Início dos blocos da Topologia do Grafo (Conexões não requeridas) ---
+            elif lstr.startswith("EDGE"): bloco = "EDGE"
+            elif lstr.startswith("ARC"): bloco = "ARC"
+
+    return dados
+
+
+# --- FORMATO BINÁRIO COMPILADO (.carpbin) ---
+# Tudo little-endian. Cabeçalho com a assinatura, o tamanho e a data de modificação
+# do .dat de origem (para detectar se ele mudou) e os escalares da instância; em
+# seguida o nome, os serviços (seis arrays int64 por tipo: id, u, v, demanda,
+# s_custo, t_custo) e as conexões (três arrays int64 u, v, custo e um array de
+# bytes com o código do tipo).
+
+ASSINATURA_COMPILADO = b"CARPINS1"
+_CABECALHO = struct.Struct("<8sqqqqqqqqq")
+_CAMPOS_SERVICO = ("id", "u", "v", "demanda", "s_custo", "t_custo")
+_TIPOS_CONEXAO = ("E", "NE", "A", "NA")
+
+def _para_little_endian(arr):
+    if sys.byteorder != "little":
+        arr = array(arr.typecode, arr); arr.byteswap()
+    return arr
+
+def compilar_instancia(dados, caminho_saida, tamanho_origem=0, mtime_origem=0):
+    """
+    Grava 'dados' no formato binário compilado, com arrays tipados.
+    A escrita usa um arquivo temporário renomeado ao final.
+    """
+    reqs = dados["requisitos"]
+    nome = dados["nome"].encode("utf-8")
+    codigo_tipo = {t: i for i, t in enumerate(_TIPOS_CONEXAO)}
+    conexoes = dados["conexoes"]
+
+    temporario = f"{caminho_saida}.{os.getpid()}.tmp"
+    with open(temporario, "wb") as f:
+        f.write(_CABECALHO.pack(ASSINATURA_COMPILADO, tamanho_origem, mtime_origem, dados["capacidade"], dados["deposito"],
+                                dados["num_vertices"], len(reqs["nos"]), len(reqs["arestas"]), len(reqs["arcos"]), len(conexoes)))
+        f.write(struct.pack("<q", len(nome)))
+        f.write(nome)
+        for chave in ("nos", "arestas", "arcos"):
+            for campo in _CAMPOS_SERVICO:
+                _para_little_endian(array('q', [s[campo] for s in reqs[chave]])).tofile(f)
+        for pos in range(3):
+            _para_little_endian(array('q', [c[pos] for c in conexoes])).tofile(f)
+        f.write(bytes(codigo_tipo[c[3]] for c in conexoes))
+    os.replace(temporario, caminho_saida)
+
+def carregar_instancia_compilada(caminho, tamanho_origem=None, mtime_origem=None):
+    """
+    Lê um arquivo .carpbin e devolve o mesmo dicionário de ler_instancia_completa.
+    Se 'tamanho_origem'/'mtime_origem' forem informados e não baterem com os
+    gravados no arquivo (o .dat mudou), retorna None.
+    """
+    with open(caminho, "rb") as f:
+        conteudo = f.read()
+    if len(conteudo) < _CABECALHO.size or conteudo[:8] != ASSINATURA_COMPILADO:
+        return None
+    (_, tamanho, mtime, capacidade, deposito, num_vertices,
+     n_nos, n_arestas, n_arcos, n_conexoes) = _CABECALHO.unpack_from(conteudo, 0)
+    if tamanho_origem is not None and (tamanho, mtime) != (tamanho_origem, mtime_origem):
+        return None
+
+    pos = _CABECALHO.size
+    tam_nome = struct.unpack_from("<q", conteudo, pos)[0]; pos += 8
+    nome = conteudo[pos:pos + tam_nome].decode("utf-8"); pos += tam_nome
+
+    def ler_array(qtd):
+        nonlocal pos
+        arr = array('q', conteudo[pos:pos + 8 * qtd])
+        if sys.byteorder != "little": arr.byteswap()
+        pos += 8 * qtd
+        return arr
+
+    requisitos = {}
+    for chave, qtd in (("nos", n_nos), ("arestas", n_arestas), ("arcos", n_arcos)):
+        colunas = [ler_array(qtd) for _ in _CAMPOS_SERVICO]
+        requisitos[chave] = [dict(zip(_CAMPOS_SERVICO, valores)) for valores in zip(*colunas)]
+    us, vs, custos = ler_array(n_conexoes), ler_array(n_conexoes), ler_array(n_conexoes)
+    tipos = [_TIPOS_CONEXAO[c] for c in conteudo[pos:pos + n_conexoes]]
+
+    return {
+        "nome": nome,
+        "optimal_value": None,
+        "capacidade": capacidade,
+        "deposito": deposito,
+        "num_vertices": num_vertices,
+        "requisitos": requisitos,
+        "conexoes": list(zip(us, vs, custos, tipos))
+    }
+
+def carregar_instancia(caminho, pasta_compilados=None):
+    """
+    Ponto de entrada recomendado para ler uma instância. Sem 'pasta_compilados',
+    equivale a ler_instancia_completa. Com ela, usa o .carpbin da instância se ele
+    estiver atualizado em relação ao .dat; caso contrário, lê o texto e grava o .carpbin.
+    """
+    if pasta_compilados is None:
+        return ler_instancia_completa(caminho)
+
+    info = os.stat(caminho)
+    compilado = os.path.join(pasta_compilados, os.path.basename(caminho) + ".carpbin")
+    if os.path.exists(compilado):
+        dados = carregar_instancia_compilada(compilado, info.st_size, info.st_mtime_ns)
+        if dados is not None:
+            return dados
+
+    dados = ler_instancia_completa(caminho)
+    try:
+        os.makedirs(pasta_compilados, exist_ok=True)
+        compilar_instancia(dados, compilado, info.st_size, info.st_mtime_ns)
+    except OSError as e:
+        print(f"AVISO: não foi possível gravar a instância compilada: {e}")
     return dados
\ No newline at end of file
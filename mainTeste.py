@@ -5,9 +5,10 @@
 import os
 import time
 # Importa as funções principais de cada módulo do projeto.
-from leitura import ler_instancia_completa
+from leitura import carregar_instancia
 from construtivo import gerar_solucao_viavel
 from melhoria import aprimorar_solucao_vns # Mudei para VNS para consistência
+from metricas import METRICAS
 
 def main():
     # --- CONFIGURAÇÃO ---
@@ -16,6 +17,10 @@ def main():
 
     base_dir = os.path.dirname(os.path.abspath(__file__))
     path = os.path.join(base_dir, "Ins", inst)
+    # Cache em disco das matrizes de distâncias (uma por instância, ver cache_disco.py).
+    pasta_cache = os.path.join(base_dir, "CacheDistancias")
+    # Versão binária da instância, para pular a leitura do texto (ver leitura.py).
+    pasta_compilados = os.path.join(base_dir, "CacheInstancias")
 
     if not os.path.exists(path):
         print(f"ERRO: Arquivo de instância não encontrado em '{path}'")
@@ -26,26 +31,28 @@ def main():
     # --- FLUXO DE EXECUÇÃO ---
     # 1. LEITURA DOS DADOS
     # Carrega todas as informações do arquivo .dat para a memória.
-    dados = ler_instancia_completa(path)
+    with METRICAS.cronometrar("etapa.leitura"):
+        dados = carregar_instancia(path, pasta_compilados)
 
     t_inicio = time.time()
 
     # 2. HEURÍSTICA CONSTRUTIVA
     # Gera a primeira solução viável usando a nossa estratégia de inserção gulosa.
     print("1. Gerando solução construtiva inicial...")
-    rotas_info, grafo_obj = gerar_solucao_viavel(dados)
-    custo_inicial = sum(r["custo"] for r in rotas_info)
+    rotas_info, grafo_obj = gerar_solucao_viavel(dados, pasta_cache)
+    custo_inicial = sum(r.custo for r in rotas_info)
     print(f"   -> Custo inicial: {int(round(custo_inicial))}, Rotas: {len(rotas_info)}")
 
     # 3. HEURÍSTICA DE MELHORIA
     # Pega a solução inicial e tenta aprimorá-la usando a busca local (VNS).
     print("\n2. Aprimorando solução com VNS (Relocate, Swap, 2-Opt)...")
-    aprimorar_solucao_vns(rotas_info, dados, grafo_obj)
+    with METRICAS.cronometrar("etapa.melhoria"):
+        aprimorar_solucao_vns(rotas_info, dados, grafo_obj)
 
     t_fim = time.time()
     tempo_total_secs = t_fim - t_inicio
     
-    custo_final = sum(r["custo"] for r in rotas_info)
+    custo_final = sum(r.custo for r in rotas_info)
 
     # --- RESULTADO FINAL ---
     print("\n--- Resultado Final ---")
@@ -55,5 +62,16 @@ def main():
     print(f"Tempo de Execução:  {tempo_total_secs:.4f} segundos")
     print("-----------------------\n")
 
+    # --- MÉTRICAS ---
+    # Tempo por etapa e contadores internos (ver metricas.py).
+    resumo = METRICAS.resumo()
+    print("--- Métricas ---")
+    for nome, segundos in sorted(resumo["tempos"].items()):
+        print(f"{nome:<28} {segundos:.4f}s")
+    for nome, quantidade in sorted(resumo["contadores"].items()):
+        print(f"{nome:<28} {quantidade}")
+    for nome, taxa in sorted(resumo["taxas"].items()):
+        print(f"{nome:<28} {taxa:.0f}/s")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
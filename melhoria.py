@@ -3,225 +3,619 @@
 # Depois de ter uma solução inicial do construtivo, este código tenta
 # aprimorá-la fazendo pequenas alterações iterativas para reduzir o custo total.
 
+import heapq
 import math
 import time
-from grafo import calcular_custo_rota
+from modelo import TIPO_ARESTA, TIPO_ARCO
+from metricas import METRICAS
+import avaliacao_lote
 
 # --- CRITÉRIO DE PARADA ---
 # Define um tempo máximo global para a fase de melhoria, para evitar que
 # o programa rode indefinidamente em instâncias muito complexas.
 MAX_TIME_GLOBAL_SECONDS = 120 
 
-def aprimorar_solucao_vns(rotas_info, dados, grafo):
+def _prazo_esgotado(prazo):
+    """True se o instante 'prazo' (em time.perf_counter) já passou. None = sem prazo."""
+    return prazo is not None and time.perf_counter() > prazo
+
+def aprimorar_solucao_vns(rotas_info, dados, grafo, k_vizinhos=None, tempo_limite=None,
+                          max_iteracoes=None, progresso=None, primeira_melhoria=False, processos_vizinhanca=None):
     """
     Função principal que orquestra a melhoria da solução usando uma abordagem
     inspirada no VNS (Variable Neighborhood Search - Busca em Vizinhança Variável).
     Ela aplica uma sequência de movimentos (Relocate, Swap, 2-Opt) repetidamente.
+
+    Se 'k_vizinhos' for informado, Relocate e Swap usam vizinhanças granulares:
+    cada serviço só é avaliado junto aos seus k serviços mais próximos
+    (ver calcular_vizinhos). Com None, as vizinhanças completas são usadas.
+
+    ORÇAMENTO (modo "anytime"):
+        - 'tempo_limite' (segundos; None = MAX_TIME_GLOBAL_SECONDS, lido a cada
+          chamada; math.inf = sem limite) é verificado também DENTRO
+          das varreduras das vizinhanças: ao estourar, a varredura para e aplica o
+          melhor movimento que já tinha encontrado, então a função retorna no prazo
+          mesmo em instâncias grandes. A preparação (listas de vizinhos, processos
+          do modo paralelo) também conta no prazo: se ele acabar durante o cálculo
+          das listas de vizinhos, as vizinhanças completas são usadas;
+        - 'max_iteracoes' limita o número de movimentos aplicados.
+    Só movimentos que reduzem o custo são aplicados, então 'rotas_info' é sempre a
+    melhor solução encontrada até o momento e pode ser usada assim que a função
+    retornar (ou de dentro do callback).
+
+    'progresso', se informado, é chamado após cada movimento aplicado como
+    progresso(custo_atual, iteracao, tempo_decorrido, vizinhanca); se ele retornar
+    True, a busca é encerrada.
+
+    PRIMEIRA MELHORIA ('primeira_melhoria=True'): cada vizinhança aplica o melhor
+    movimento do PRIMEIRO serviço que tiver algum movimento de melhoria, em vez de
+    varrer a solução inteira. Serviços sem melhoria recebem um "bit de não olhar"
+    (um por vizinhança) e são pulados nas varreduras seguintes; os bits só voltam a
+    zero para os serviços das rotas alteradas por um movimento aceito. Assim, cada
+    iteração examina apenas as partes da solução que mudaram. Ao convergir, uma
+    varredura completa confirma o ótimo local.
+
+    PARALELO ('processos_vizinhanca' > 1): as varreduras do Relocate e do Swap são
+    divididas entre esse número de processos (ver vizinhanca_paralela.py), com o
+    mesmo resultado da varredura serial. Não se aplica ao modo primeira melhoria.
+
+    Retorna o custo final da solução.
     """
     print("    -> Iniciando fase de melhoria VNS (Relocate, Swap, 2-Opt)...")
     
-    start_time_global = time.time()
-
-    # O loop principal do VNS. Ele continuará tentando melhorar a solução
-    # até que nenhum dos movimentos consiga encontrar uma redução de custo.
-    while True:
-        # Critério de parada por tempo.
-        if time.time() - start_time_global > MAX_TIME_GLOBAL_SECONDS:
-            print("      AVISO: Tempo limite global atingido. Finalizando melhoria.")
-            break
+    start_time_global = time.perf_counter()
+    if tempo_limite is None:
+        tempo_limite = MAX_TIME_GLOBAL_SECONDS
+    prazo = start_time_global + tempo_limite if tempo_limite != math.inf else None
+    iteracao = 0
 
-        custo_antes_iteracao = sum(r['custo'] for r in rotas_info)
-        
-        # --- ESTRUTURA VNS ---
-        # 1. Tenta o primeiro tipo de movimento: Relocate.
-        #    A ideia é: se um movimento simples funciona, ótimo. Comece de novo.
-        print(f"      [VNS] Custo atual: {int(round(custo_antes_iteracao))}. Tentando Relocate...")
-        if find_best_relocate(rotas_info, dados, grafo):
-            continue # Se melhorou, o 'continue' reinicia o loop do VNS.
-
-        # 2. Se Relocate não melhorou, tenta um movimento mais complexo: Swap.
-        print(f"      [VNS] Custo atual: {int(round(sum(r['custo'] for r in rotas_info)))}. Tentando Swap...")
-        if find_best_swap(rotas_info, dados, grafo):
-            continue # Se melhorou, reinicia o loop do VNS.
+    # Custo total da solução, mantido incrementalmente: cada vizinhança retorna o
+    # ganho do movimento aplicado, então não é preciso somar todas as rotas de novo.
+    custo_atual = sum(r.custo for r in rotas_info)
+
+    # As listas de candidatos dependem só das distâncias, então são calculadas uma vez.
+    # Se o prazo acabar durante o cálculo, ficam as vizinhanças completas (None).
+    vizinhos = calcular_vizinhos(rotas_info, grafo, k_vizinhos, prazo) if k_vizinhos else None
+
+    # Bits de não olhar (modo primeira melhoria): um bytearray por vizinhança, indexado pelo global_id.
+    nao_olhar = None
+    if primeira_melhoria:
+        total = grafo.servicos.total + 1
+        nao_olhar = {"relocate": bytearray(total), "swap": bytearray(total), "2opt": bytearray(total)}
+    iteracao_confirmada = 0
+
+    avaliador = None
+    if processos_vizinhanca and processos_vizinhanca > 1 and not primeira_melhoria and not _prazo_esgotado(prazo):
+        import vizinhanca_paralela # Aqui para evitar o import circular (ele importa este módulo).
+        avaliador = vizinhanca_paralela.AvaliadorParalelo(dados, grafo, processos_vizinhanca, vizinhos)
+
+    # O avaliador paralelo é fechado mesmo se a busca for interrompida por uma exceção.
+    try:
+        # O loop principal do VNS. Ele continuará tentando melhorar a solução
+        # até que nenhum dos movimentos consiga encontrar uma redução de custo.
+        while True:
+            # Critérios de parada por tempo e por número de iterações.
+            if _prazo_esgotado(prazo):
+                print("      AVISO: Tempo limite global atingido. Finalizando melhoria.")
+                break
+            if max_iteracoes is not None and iteracao >= max_iteracoes:
+                print("      AVISO: Limite de iterações atingido. Finalizando melhoria.")
+                break
+
+            # --- ESTRUTURA VNS ---
+            # 1. Tenta o primeiro tipo de movimento: Relocate.
+            #    A ideia é: se um movimento simples funciona, ótimo. Comece de novo.
+            print(f"      [VNS] Custo atual: {int(round(custo_atual))}. Tentando Relocate...")
+            with METRICAS.cronometrar("vizinhanca.relocate"):
+                ganho = find_best_relocate(rotas_info, dados, grafo, vizinhos, prazo, nao_olhar, avaliador)
+            if ganho:
+                METRICAS.contar("relocate.melhorias")
+                custo_atual -= ganho
+                iteracao += 1
+                if progresso is not None and progresso(custo_atual, iteracao, time.perf_counter() - start_time_global, "relocate"):
+                    break
+                continue # Se melhorou, o 'continue' reinicia o loop do VNS.
+
+            # 2. Se Relocate não melhorou, tenta um movimento mais complexo: Swap.
+            print(f"      [VNS] Custo atual: {int(round(custo_atual))}. Tentando Swap...")
+            with METRICAS.cronometrar("vizinhanca.swap"):
+                ganho = find_best_swap(rotas_info, dados, grafo, vizinhos, prazo, nao_olhar, avaliador)
+            if ganho:
+                METRICAS.contar("swap.melhorias")
+                custo_atual -= ganho
+                iteracao += 1
+                if progresso is not None and progresso(custo_atual, iteracao, time.perf_counter() - start_time_global, "swap"):
+                    break
+                continue # Se melhorou, reinicia o loop do VNS.
         
-        # 3. Se nem Relocate nem Swap funcionaram, tenta um movimento intra-rota: 2-Opt.
-        print(f"      [VNS] Custo atual: {int(round(sum(r['custo'] for r in rotas_info)))}. Tentando 2-Opt...")
-        if find_best_2opt(rotas_info, dados, grafo):
-            continue # Se melhorou, reinicia o loop do VNS.
+            # 3. Se nem Relocate nem Swap funcionaram, tenta um movimento intra-rota: 2-Opt.
+            print(f"      [VNS] Custo atual: {int(round(custo_atual))}. Tentando 2-Opt...")
+            with METRICAS.cronometrar("vizinhanca.2opt"):
+                ganho = find_best_2opt(rotas_info, dados, grafo, prazo, nao_olhar)
+            if ganho:
+                METRICAS.contar("2opt.melhorias")
+                custo_atual -= ganho
+                iteracao += 1
+                if progresso is not None and progresso(custo_atual, iteracao, time.perf_counter() - start_time_global, "2opt"):
+                    break
+                continue # Se melhorou, reinicia o loop do VNS.
         
-        # 4. Se NENHUM dos movimentos acima resultou em melhoria,
-        #    significa que atingimos um "ótimo local". O algoritmo para.
-        break
+            # 4. Se NENHUM dos movimentos acima resultou em melhoria,
+            #    significa que atingimos um "ótimo local". O algoritmo para.
+            #    Com bits de não olhar, antes de parar todos os bits são zerados uma vez
+            #    para confirmar o ótimo local com uma varredura completa (só se houve
+            #    movimentos desde a última confirmação).
+            if nao_olhar is not None and iteracao > iteracao_confirmada:
+                iteracao_confirmada = iteracao
+                for bits in nao_olhar.values():
+                    bits[:] = bytes(len(bits))
+                continue
+            break
 
+    finally:
+        if avaliador is not None:
+            avaliador.fechar()
     print("    -> Melhoria VNS concluída.")
+    return custo_atual
+
+
+def calcular_vizinhos(rotas_info, grafo, k_vizinhos, prazo=None):
+    """
+    Lista de candidatos (vizinhança granular): para cada serviço, os 'k_vizinhos'
+    serviços mais próximos. A proximidade entre dois serviços é a menor distância,
+    em qualquer sentido, entre uma extremidade de um e uma extremidade do outro.
+    Se o instante 'prazo' (time.perf_counter) passar antes do fim, retorna None.
+
+    OTIMIZAÇÃO: com o NumPy, o cálculo é vetorizado por blocos de serviços
+    (ver avaliacao_lote.vizinhos_mais_proximos), com o mesmo resultado; o laço em
+    Python abaixo, O(n²) com oito consultas por par, fica como alternativa.
+
+    Returns:
+        dict: global_id -> set com os global_ids dos serviços mais próximos (ou None).
+    """
+    if avaliacao_lote.NUMPY_DISPONIVEL:
+        return avaliacao_lote.vizinhos_mais_proximos(rotas_info, grafo, k_vizinhos, lambda: _prazo_esgotado(prazo))
+    matriz, k = grafo.matriz, grafo.k
+    inicio, fim = grafo.servicos.inicio, grafo.servicos.fim
+    extremidades = [(cod >> 1, inicio[cod], fim[cod]) for rota in rotas_info for cod in rota.seq]
+
+    vizinhos = {}
+    for sid_a, a1, a2 in extremidades:
+        if _prazo_esgotado(prazo):
+            return None
+        linha1 = matriz[a1 * k:(a1 + 1) * k]
+        linha2 = matriz[a2 * k:(a2 + 1) * k]
+        proximidade = []
+        for sid_b, b1, b2 in extremidades:
+            if sid_b == sid_a: continue
+            d = min(linha1[b1], linha1[b2], linha2[b1], linha2[b2],
+                    matriz[b1 * k + a1], matriz[b1 * k + a2], matriz[b2 * k + a1], matriz[b2 * k + a2])
+            proximidade.append((d, sid_b))
+        vizinhos[sid_a] = {sid_b for _, sid_b in heapq.nsmallest(k_vizinhos, proximidade)}
+    return vizinhos
+
+
+def _liberar_rotas(nao_olhar, rotas):
+    """Zera os bits de não olhar, em todas as vizinhanças, dos serviços das 'rotas'."""
+    for bits in nao_olhar.values():
+        for rota in rotas:
+            for cod in rota.seq:
+                bits[cod >> 1] = 0
+
+
+def _localizar_servicos(rotas_info):
+    """Mapeia global_id -> (índice da rota, posição na rota)."""
+    return {cod >> 1: (r_idx, pos) for r_idx, rota in enumerate(rotas_info) for pos, cod in enumerate(rota.seq)}
+
+
+def _posicoes_granulares(sid, r_origem, vizinhos, local, deslocamentos):
+    """
+    Posições candidatas de uma vizinhança granular: para cada vizinho de 'sid'
+    que está em outra rota, as posições 'posição do vizinho + d' para cada d em
+    'deslocamentos'. Retorna um dict: índice da rota -> lista de posições.
+    """
+    posicoes = {}
+    for viz in vizinhos[sid]:
+        r_idx, pos = local[viz]
+        if r_idx == r_origem: continue
+        lista = posicoes.setdefault(r_idx, [])
+        for d in deslocamentos:
+            if pos + d not in lista:
+                lista.append(pos + d)
+    return posicoes
 
 
-def find_best_relocate(rotas_info, dados, grafo):
+def find_best_relocate(rotas_info, dados, grafo, vizinhos=None, prazo=None, nao_olhar=None, avaliador=None):
     """
     Movimento RELOCATE (Realocação): Tenta mover um serviço de uma rota para outra.
     Busca o melhor movimento de realocação possível em toda a solução.
-    Retorna True se uma melhoria foi feita, False caso contrário.
+    Retorna o ganho (redução de custo) do movimento aplicado, ou 0 se não houve melhoria.
+
+    O ganho de cada candidato é calculado em O(1): só mudam as ligações entre o
+    serviço e seus vizinhos (antecessor e sucessor), então não é preciso copiar a
+    rota nem recalcular seu custo inteiro. O custo completo só é recalculado para
+    as rotas modificadas quando o movimento é aplicado.
+
+    Com 'vizinhos' (ver calcular_vizinhos), o serviço só é inserido imediatamente
+    antes ou depois de um dos seus vizinhos mais próximos.
+
+    Se o instante 'prazo' (time.perf_counter) passar durante a varredura, ela é
+    interrompida e o melhor movimento encontrado até ali é aplicado.
+
+    Com 'nao_olhar' (ver aprimorar_solucao_vns), aplica o melhor movimento do
+    primeiro serviço que tiver melhoria e pula os serviços marcados.
+
+    Com um 'avaliador' (vizinhanca_paralela.AvaliadorParalelo), a varredura é
+    dividida entre processos; o movimento aplicado é o mesmo da varredura serial.
+    Ele não é usado com 'nao_olhar', cuja varredura é sequencial por natureza.
+    """
+    bits = nao_olhar["relocate"] if nao_olhar is not None else None
+    if avaliador is not None and bits is None:
+        # Pares de rotas divididos entre processos (ver vizinhanca_paralela.py).
+        melhor_ganho, melhor_movimento, avaliacoes = avaliador.melhor_movimento("relocate", rotas_info, prazo)
+    else:
+        melhor_ganho, melhor_movimento, avaliacoes = _varrer_relocate(rotas_info, dados, grafo, vizinhos, prazo, bits)
+    METRICAS.contar("relocate.avaliacoes", avaliacoes)
+    
+    # Se encontramos um movimento que gera um ganho positivo...
+    if melhor_movimento:
+        # ... APLICA O MOVIMENTO ...
+        r1_idx, s1_idx, r2_idx, s2_idx = melhor_movimento
+        
+        # As rotas atualizam custo e carga a partir da posição alterada.
+        servico_movido = rotas_info[r1_idx].remover(s1_idx, grafo)
+        rotas_info[r2_idx].inserir(s2_idx, servico_movido, grafo)
+        if nao_olhar is not None:
+            _liberar_rotas(nao_olhar, (rotas_info[r1_idx], rotas_info[r2_idx]))
+
+        return melhor_ganho # Indica que uma melhoria foi feita (e de quanto).
+    return 0
+
+
+def _varrer_relocate(rotas_info, dados, grafo, vizinhos=None, prazo=None, bits=None, origens=None):
+    """
+    Varredura do Relocate sem aplicar o movimento. Retorna (melhor_ganho,
+    (r1, s1, r2, s2), avaliacoes); o movimento é None se nenhum ganho for positivo.
+    Com 'origens' (conjunto de índices de rotas), só serviços dessas rotas são
+    movidos, o que permite dividir a varredura entre processos.
     """
     deposito = dados["deposito"]
     capacidade = dados["capacidade"]
+    matriz, indice, k = grafo.matriz, grafo.indice, grafo.k
+    demanda, custo_fixo = grafo.servicos.demanda, grafo.servicos.custo
+    i_dep = indice[deposito]
     melhor_ganho = 0
     melhor_movimento = None
+    avaliacoes = 0 # Candidatos avaliados, registrados nas métricas ao final.
+
+    local = _localizar_servicos(rotas_info) if vizinhos is not None else None
+
+    if vizinhos is None and bits is None and avaliacao_lote.usar_vetorizado(rotas_info):
+        # OTIMIZAÇÃO: a vizinhança completa é avaliada com NumPy, todas as posições
+        # de inserção de um serviço de uma vez (ver avaliacao_lote.py). O movimento
+        # escolhido é o mesmo do laço em Python abaixo.
+        return avaliacao_lote.melhor_relocate(rotas_info, grafo, capacidade,
+                                              lambda: _prazo_esgotado(prazo), origens)
 
     # Itera sobre cada rota de origem (r1)
     for r1_idx, rota1 in enumerate(rotas_info):
+        if origens is not None and r1_idx not in origens:
+            continue
+        inicios1, fins1 = rota1.inicios, rota1.fins
+        n1 = len(rota1.seq)
+        if vizinhos is None:
+            # Vizinhança completa: todas as posições de todas as outras rotas.
+            todas_posicoes = {r2_idx: range(len(rotas_info[r2_idx]) + 1)
+                              for r2_idx in range(len(rotas_info)) if r2_idx != r1_idx}
+        if _prazo_esgotado(prazo):
+            break
         # Itera sobre cada serviço (s1) na rota de origem
-        for s1_idx in range(len(rota1["servicos"])):
-            servico_para_mover = rota1["servicos"][s1_idx]
-            
-            # Itera sobre cada rota de destino (r2)
-            for r2_idx, rota2 in enumerate(rotas_info):
-                if r1_idx == r2_idx: continue # Não podemos mover um serviço para a mesma rota
+        for s1_idx in range(n1):
+            if _prazo_esgotado(prazo):
+                break
+            id_mover = rota1.seq[s1_idx] >> 1
+            if bits is not None and bits[id_mover]:
+                continue
+            demanda_s = demanda[id_mover]
+            custo_servico = custo_fixo[id_mover]
+            ini_s, fim_s = inicios1[s1_idx], fins1[s1_idx]
+
+            # CÁLCULO DO GANHO DE REMOÇÃO:
+            # Antes: ant -> s -> prox. Depois: ant -> prox.
+            ant = fins1[s1_idx - 1] if s1_idx > 0 else i_dep
+            prox = inicios1[s1_idx + 1] if s1_idx + 1 < n1 else i_dep
+            ganho_remocao = (matriz[ant * k + ini_s] + custo_servico + matriz[fim_s * k + prox]
+                             - matriz[ant * k + prox])
+
+            if vizinhos is None:
+                posicoes = todas_posicoes
+            else:
+                posicoes = _posicoes_granulares(id_mover, r1_idx, vizinhos, local, (0, 1))
+
+            # Itera sobre cada rota de destino (r2) e suas posições candidatas.
+            for r2_idx, posicoes_r2 in posicoes.items():
+                rota2 = rotas_info[r2_idx]
 
                 # VERIFICAÇÃO DE VIABILIDADE: Garante que a rota de destino tem capacidade.
-                if rota2["demanda"] + servico_para_mover[3] > capacidade:
+                if rota2.demanda + demanda_s > capacidade:
                     continue
 
-                custo_original = rota1["custo"] + rota2["custo"]
-                
-                # CÁLCULO DO GANHO:
-                # 1. Calcula o novo custo da rota de origem sem o serviço.
-                rota1_temp = rota1["servicos"][:s1_idx] + rota1["servicos"][s1_idx+1:]
-                custo1_novo = calcular_custo_rota(rota1_temp, grafo, deposito)
-
-                # 2. Tenta inserir o serviço em todas as posições possíveis da rota de destino.
-                for s2_idx in range(len(rota2["servicos"]) + 1):
-                    rota2_temp = rota2["servicos"][:s2_idx] + [servico_para_mover] + rota2["servicos"][s2_idx:]
-                    custo2_novo = calcular_custo_rota(rota2_temp, grafo, deposito)
-                    
-                    custo_novo_total = custo1_novo + custo2_novo
-                    ganho = custo_original - custo_novo_total
+                inicios2, fins2 = rota2.inicios, rota2.fins
+                n2 = len(inicios2)
+                avaliacoes += len(posicoes_r2)
+
+                # Tenta inserir o serviço nas posições candidatas da rota de destino.
+                # Antes: ant -> prox. Depois: ant -> s -> prox.
+                for s2_idx in posicoes_r2:
+                    ant = fins2[s2_idx - 1] if s2_idx > 0 else i_dep
+                    prox = inicios2[s2_idx] if s2_idx < n2 else i_dep
+                    custo_insercao = (matriz[ant * k + ini_s] + custo_servico + matriz[fim_s * k + prox]
+                                      - matriz[ant * k + prox])
+                    ganho = ganho_remocao - custo_insercao
 
                     # Se o ganho deste movimento for o melhor até agora, armazena-o.
                     if ganho > melhor_ganho:
                         melhor_ganho = ganho
                         melhor_movimento = (r1_idx, s1_idx, r2_idx, s2_idx)
-    
-    # Se encontramos um movimento que gera um ganho positivo...
-    if melhor_movimento:
-        # ... APLICA O MOVIMENTO ...
-        r1_idx, s1_idx, r2_idx, s2_idx = melhor_movimento
-        
-        servico_movido = rotas_info[r1_idx]["servicos"].pop(s1_idx)
-        rotas_info[r2_idx]["servicos"].insert(s2_idx, servico_movido)
-        
-        # ... e atualiza os dados das rotas modificadas.
-        for idx in [r1_idx, r2_idx]:
-            rotas_info[idx]["custo"] = calcular_custo_rota(rotas_info[idx]["servicos"], grafo, deposito)
-            rotas_info[idx]["demanda"] = sum(s[3] for s in rotas_info[idx]["servicos"])
-            rotas_info[idx]["servicos_str"] = [f"(S {s[0]},{s[1]},{s[2]})" for s in rotas_info[idx]["servicos"]]
 
-        return True # Indica que uma melhoria foi feita.
-    return False
+            if bits is not None:
+                # Primeira melhoria: para no primeiro serviço com melhoria; sem ela, marca o serviço.
+                if melhor_movimento:
+                    break
+                bits[id_mover] = 1
+        if bits is not None and melhor_movimento:
+            break
+    return melhor_ganho, melhor_movimento, avaliacoes
 
 
-def find_best_swap(rotas_info, dados, grafo):
+def find_best_swap(rotas_info, dados, grafo, vizinhos=None, prazo=None, nao_olhar=None, avaliador=None):
     """
     Movimento SWAP (Troca): Tenta trocar um serviço de uma rota por um serviço de outra.
     Busca a melhor troca possível em toda a solução.
-    Retorna True se uma melhoria foi feita, False caso contrário.
+    Retorna o ganho (redução de custo) da troca aplicada, ou 0 se não houve melhoria.
+
+    Assim como no Relocate, o ganho é calculado em O(1) a partir dos vizinhos de
+    cada posição trocada, sem montar rotas temporárias.
+
+    Com 'vizinhos' (ver calcular_vizinhos), um serviço só é trocado com um dos seus
+    vizinhos mais próximos.
+
+    'prazo' e 'nao_olhar' funcionam como no Relocate. Com 'nao_olhar', cada serviço
+    é comparado com todas as outras rotas (e não só com as seguintes), já que o
+    parceiro da troca pode estar em uma rota cujos serviços estão marcados.
+
+    'avaliador' funciona como no Relocate.
+    """
+    bits = nao_olhar["swap"] if nao_olhar is not None else None
+    if avaliador is not None and bits is None:
+        # Pares de rotas divididos entre processos (ver vizinhanca_paralela.py).
+        melhor_ganho, melhor_movimento, avaliacoes = avaliador.melhor_movimento("swap", rotas_info, prazo)
+    else:
+        melhor_ganho, melhor_movimento, avaliacoes = _varrer_swap(rotas_info, dados, grafo, vizinhos, prazo, bits)
+    METRICAS.contar("swap.avaliacoes", avaliacoes)
+
+    # Se uma troca vantajosa foi encontrada...
+    if melhor_movimento:
+        # ... APLICA A TROCA ...
+        r1_idx, s1_idx, r2_idx, s2_idx = melhor_movimento
+        
+        # As rotas atualizam custo e carga a partir da posição alterada.
+        rota1, rota2 = rotas_info[r1_idx], rotas_info[r2_idx]
+        cod1 = rota1.substituir(s1_idx, rota2.seq[s2_idx], grafo)
+        rota2.substituir(s2_idx, cod1, grafo)
+        if nao_olhar is not None:
+            _liberar_rotas(nao_olhar, (rota1, rota2))
+            
+        return melhor_ganho
+    return 0
+
+
+def _varrer_swap(rotas_info, dados, grafo, vizinhos=None, prazo=None, bits=None, origens=None):
+    """
+    Varredura do Swap sem aplicar o movimento; mesmo retorno e mesmo 'origens'
+    de _varrer_relocate (aqui, as rotas do primeiro serviço de cada troca).
     """
     deposito = dados["deposito"]
     capacidade = dados["capacidade"]
+    matriz, indice, k = grafo.matriz, grafo.indice, grafo.k
+    demanda, custo_fixo = grafo.servicos.demanda, grafo.servicos.custo
+    i_dep = indice[deposito]
     melhor_ganho = 0
     melhor_movimento = None
+    avaliacoes = 0 # Candidatos avaliados, registrados nas métricas ao final.
 
-    # Itera sobre todos os pares de rotas (r1, r2)
-    for r1_idx in range(len(rotas_info)):
-        for r2_idx in range(r1_idx + 1, len(rotas_info)):
-            rota1 = rotas_info[r1_idx]
-            rota2 = rotas_info[r2_idx]
-            
-            # Itera sobre todos os pares de serviços (s1, s2), um de cada rota
-            for s1_idx, servico1 in enumerate(rota1["servicos"]):
-                for s2_idx, servico2 in enumerate(rota2["servicos"]):
+    local = _localizar_servicos(rotas_info) if vizinhos is not None else None
+
+    if vizinhos is None and bits is None and avaliacao_lote.usar_vetorizado(rotas_info):
+        # OTIMIZAÇÃO: vizinhança completa vetorizada, como no Relocate.
+        return avaliacao_lote.melhor_swap(rotas_info, grafo, capacidade,
+                                          lambda: _prazo_esgotado(prazo), origens)
+
+    # Itera sobre cada rota (r1) e cada serviço (s1) dela.
+    for r1_idx, rota1 in enumerate(rotas_info):
+        if origens is not None and r1_idx not in origens:
+            continue
+        inicios1, fins1 = rota1.inicios, rota1.fins
+        n1 = len(inicios1)
+        if vizinhos is None:
+            # Vizinhança completa: todos os pares de rotas (r1, r2) com r2 > r1
+            # (com bits de não olhar, todas as rotas r2 != r1).
+            primeira = 0 if bits is not None else r1_idx + 1
+            todas_posicoes = {r2_idx: range(len(rotas_info[r2_idx]))
+                              for r2_idx in range(primeira, len(rotas_info)) if r2_idx != r1_idx}
+
+        if _prazo_esgotado(prazo):
+            break
+        for s1_idx, cod1 in enumerate(rota1.seq):
+            if _prazo_esgotado(prazo):
+                break
+            id1 = cod1 >> 1
+            if bits is not None and bits[id1]:
+                continue
+            # Vizinhos de s1 na rota 1 e o custo atual das ligações ant1 -> s1 -> prox1.
+            ant1 = fins1[s1_idx - 1] if s1_idx > 0 else i_dep
+            prox1 = inicios1[s1_idx + 1] if s1_idx + 1 < n1 else i_dep
+            ini1, fim1 = inicios1[s1_idx], fins1[s1_idx]
+            custo_serv1 = custo_fixo[id1]
+            atual1 = matriz[ant1 * k + ini1] + custo_serv1 + matriz[fim1 * k + prox1]
+
+            if vizinhos is None:
+                posicoes = todas_posicoes
+            else:
+                posicoes = _posicoes_granulares(id1, r1_idx, vizinhos, local, (0,))
+
+            # Itera sobre os serviços (s2) candidatos das outras rotas.
+            for r2_idx, posicoes_r2 in posicoes.items():
+                rota2 = rotas_info[r2_idx]
+                inicios2, fins2 = rota2.inicios, rota2.fins
+                n2 = len(inicios2)
+                avaliacoes += len(posicoes_r2)
+
+                for s2_idx in posicoes_r2:
+                    id2 = rota2.seq[s2_idx] >> 1
                     
                     # VERIFICAÇÃO DE VIABILIDADE: Garante que a troca não viola a capacidade de nenhuma das rotas.
-                    if (rota1["demanda"] - servico1[3] + servico2[3] > capacidade) or \
-                       (rota2["demanda"] - servico2[3] + servico1[3] > capacidade):
+                    if (rota1.demanda - demanda[id1] + demanda[id2] > capacidade) or \
+                       (rota2.demanda - demanda[id2] + demanda[id1] > capacidade):
                         continue
 
-                    custo_original = rota1["custo"] + rota2["custo"]
-                    
-                    # CÁLCULO DO GANHO:
-                    # Cria rotas temporárias com a troca para calcular o novo custo.
-                    rota1_temp_servicos = rota1["servicos"][:s1_idx] + [servico2] + rota1["servicos"][s1_idx+1:]
-                    rota2_temp_servicos = rota2["servicos"][:s2_idx] + [servico1] + rota2["servicos"][s2_idx+1:]
+                    ant2 = fins2[s2_idx - 1] if s2_idx > 0 else i_dep
+                    prox2 = inicios2[s2_idx + 1] if s2_idx + 1 < n2 else i_dep
+                    ini2, fim2 = inicios2[s2_idx], fins2[s2_idx]
+                    custo_serv2 = custo_fixo[id2]
+                    atual2 = matriz[ant2 * k + ini2] + custo_serv2 + matriz[fim2 * k + prox2]
 
-                    custo_novo_total = calcular_custo_rota(rota1_temp_servicos, grafo, deposito) + \
-                                       calcular_custo_rota(rota2_temp_servicos, grafo, deposito)
+                    # CÁLCULO DO GANHO:
+                    # s2 passa a ocupar a posição de s1 (entre ant1 e prox1) e vice-versa.
+                    novo1 = matriz[ant1 * k + ini2] + custo_serv2 + matriz[fim2 * k + prox1]
+                    novo2 = matriz[ant2 * k + ini1] + custo_serv1 + matriz[fim1 * k + prox2]
 
-                    ganho = custo_original - custo_novo_total
+                    ganho = (atual1 + atual2) - (novo1 + novo2)
                     # Se o ganho for o melhor até agora, armazena o movimento.
                     if ganho > melhor_ganho:
                         melhor_ganho = ganho
                         melhor_movimento = (r1_idx, s1_idx, r2_idx, s2_idx)
 
-    # Se uma troca vantajosa foi encontrada...
-    if melhor_movimento:
-        # ... APLICA A TROCA ...
-        r1_idx, s1_idx, r2_idx, s2_idx = melhor_movimento
-        
-        servico1 = rotas_info[r1_idx]["servicos"][s1_idx]
-        servico2 = rotas_info[r2_idx]["servicos"][s2_idx]
-        rotas_info[r1_idx]["servicos"][s1_idx] = servico2
-        rotas_info[r2_idx]["servicos"][s2_idx] = servico1
-
-        # ... e atualiza os dados das rotas modificadas.
-        for idx in [r1_idx, r2_idx]:
-            rotas_info[idx]["custo"] = calcular_custo_rota(rotas_info[idx]["servicos"], grafo, deposito)
-            rotas_info[idx]["demanda"] = sum(s[3] for s in rotas_info[idx]["servicos"])
-            rotas_info[idx]["servicos_str"] = [f"(S {s[0]},{s[1]},{s[2]})" for s in rotas_info[idx]["servicos"]]
-            
-        return True
-    return False
+            if bits is not None:
+                if melhor_movimento:
+                    break
+                bits[id1] = 1
+        if bits is not None and melhor_movimento:
+            break
+    return melhor_ganho, melhor_movimento, avaliacoes
+
+
+def _melhor_2opt_rota(rota, servicos, matriz, k, i_dep, prazo=None):
+    """
+    Avalia todas as inversões de trecho [j..k] de UMA rota e retorna a melhor como
+    (delta, j, k), ou None se nenhuma reduz o custo.
+
+    Ao inverter o trecho, as arestas passam a ser percorridas no sentido oposto.
+    Com as somas de prefixo das ligações no sentido original ('ida') e no sentido
+    invertido ('volta'), o custo interno do trecho nos dois sentidos sai em O(1):
+        ida[i]   = soma de d(fim[m], inicio[m+1])  para m < i
+        volta[i] = soma de d(inicio[m+1], fim[m])  para m < i
+    Os custos de serviço não mudam com a inversão. Trechos que contêm arcos
+    (que não podem ser invertidos) são avaliados percorrendo o trecho.
+    Se 'prazo' passar, retorna a melhor inversão avaliada até ali.
+    """
+    seq, inicios, fins = rota.seq, rota.inicios, rota.fins
+    n = len(seq)
+    tipo = servicos.tipo
+    ida = [0.0] * n
+    volta = [0.0] * n
+    arcos = [0] * (n + 1)
+    for m in range(n - 1):
+        ida[m + 1] = ida[m] + matriz[fins[m] * k + inicios[m + 1]]
+        volta[m + 1] = volta[m] + matriz[inicios[m + 1] * k + fins[m]]
+    for m in range(n):
+        arcos[m + 1] = arcos[m] + (tipo[seq[m] >> 1] == TIPO_ARCO)
+
+    melhor = None
+    melhor_delta = 0
+    for j in range(n):
+        if _prazo_esgotado(prazo):
+            break
+        ant = fins[j - 1] if j > 0 else i_dep
+        for kk in range(j, n):
+            # Inverter um único serviço só faz sentido se ele for uma aresta (troca o sentido).
+            if kk == j and tipo[seq[j] >> 1] != TIPO_ARESTA:
+                continue
+            prox = inicios[kk + 1] if kk + 1 < n else i_dep
+            antes = matriz[ant * k + inicios[j]] + (ida[kk] - ida[j]) + matriz[fins[kk] * k + prox]
 
-def find_best_2opt(rotas_info, dados, grafo):
+            if arcos[kk + 1] == arcos[j]:
+                # Trecho sem arcos: após a inversão, ele começa em fim[kk] e termina em inicio[j].
+                depois = matriz[ant * k + fins[kk]] + (volta[kk] - volta[j]) + matriz[inicios[j] * k + prox]
+            else:
+                # Trecho com arcos: percorre a sequência invertida explicitamente.
+                depois = 0.0
+                pos = ant
+                for m in range(kk, j - 1, -1):
+                    if tipo[seq[m] >> 1] == TIPO_ARCO:
+                        ini_m, fim_m = inicios[m], fins[m]
+                    else:
+                        ini_m, fim_m = fins[m], inicios[m]
+                    depois += matriz[pos * k + ini_m]
+                    pos = fim_m
+                depois += matriz[pos * k + prox]
+
+            delta = depois - antes
+            if delta < melhor_delta:
+                melhor_delta = delta
+                melhor = (delta, j, kk)
+    return melhor
+
+
+def find_best_2opt(rotas_info, dados, grafo, prazo=None, nao_olhar=None):
     """
     Movimento 2-Opt (Intra-rota): Tenta melhorar UMA rota de cada vez,
     "descruzando" caminhos. Ele remove duas arestas da rota e as reconecta
-    da única outra maneira possível, invertendo a sequência de serviços entre elas.
+    da única outra maneira possível, invertendo a sequência de serviços entre elas
+    (e o sentido de travessia das arestas requeridas dentro do trecho).
+    Retorna o ganho total das inversões aplicadas, ou 0 se não houve melhoria.
+    Ao passar o 'prazo', nenhuma rota nova é examinada.
+
+    Com 'nao_olhar', rotas cujos serviços estão todos marcados são puladas e a
+    função retorna logo após a primeira rota melhorada.
     """
     deposito = dados["deposito"]
-    houve_melhoria_geral = False
+    matriz, indice, k = grafo.matriz, grafo.indice, grafo.k
+    servicos = grafo.servicos
+    i_dep = indice[deposito]
+    ganho_total = 0
+    avaliacoes = 0 # Trechos avaliados, registrados nas métricas ao final.
+
+    bits = nao_olhar["2opt"] if nao_olhar is not None else None
 
     # Aplica o 2-Opt para cada rota individualmente.
     for rota in rotas_info:
-        if len(rota["servicos"]) < 2: continue
-        
-        custo_inicial_rota = rota["custo"]
-        
-        # Continua tentando melhorar a mesma rota até que nenhuma melhoria 2-Opt seja possível.
-        melhoria_na_rota = True
-        while melhoria_na_rota:
-            melhoria_na_rota = False
-            custo_atual = calcular_custo_rota(rota["servicos"], grafo, deposito)
-            
-            # Itera sobre todos os pares de arestas para remover (j, k).
-            for j in range(len(rota["servicos"]) - 1):
-                for k in range(j + 1, len(rota["servicos"])):
-                    # AQUI ESTÁ A LÓGICA DO 2-OPT:
-                    # Cria uma nova sequência invertendo o trecho entre j e k.
-                    # O [::-1] é o que faz a inversão.
-                    nova_sequencia = rota["servicos"][:j] + rota["servicos"][j:k+1][::-1] + rota["servicos"][k+1:]
-                    
-                    novo_custo = calcular_custo_rota(nova_sequencia, grafo, deposito)
-                    
-                    # Se a nova rota é mais barata, aceita a mudança.
-                    if novo_custo < custo_atual:
-                        rota["servicos"] = nova_sequencia
-                        custo_atual = novo_custo
-                        melhoria_na_rota = True
-                        houve_melhoria_geral = True
-                        break # Sai do loop interno para recomeçar a busca na rota modificada.
-                if melhoria_na_rota: break
-        
-        # Atualiza o custo final e a representação em string da rota.
-        rota["custo"] = calcular_custo_rota(rota["servicos"], grafo, deposito)
-        rota["servicos_str"] = [f"(S {s[0]},{s[1]},{s[2]})" for s in rota["servicos"]]
-            
-    return houve_melhoria_geral
\ No newline at end of file
+        if _prazo_esgotado(prazo): break
+        if not rota.seq: continue
+        if bits is not None and all(bits[cod >> 1] for cod in rota.seq): continue
+        ganho_rota = 0
+
+        # Continua aplicando a melhor inversão da rota até que nenhuma reduza o custo.
+        while True:
+            movimento = _melhor_2opt_rota(rota, servicos, matriz, k, i_dep, prazo)
+            avaliacoes += len(rota.seq) * (len(rota.seq) + 1) // 2
+            if movimento is None:
+                break
+            # APLICA A INVERSÃO NO PRÓPRIO LUGAR; a rota atualiza custo a partir de j.
+            delta, j, kk = movimento
+            rota.inverter_trecho(j, kk, grafo)
+            ganho_rota -= delta
+        ganho_total += ganho_rota
+
+        if bits is not None:
+            # A rota mudou: libera seus serviços nas outras vizinhanças. Em todo caso,
+            # ela agora é 2-ótima, então seus serviços ficam marcados no 2-Opt.
+            if ganho_rota:
+                _liberar_rotas(nao_olhar, (rota,))
+            for cod in rota.seq:
+                bits[cod >> 1] = 1
+            if ganho_rota:
+                break
+
+    METRICAS.contar("2opt.avaliacoes", avaliacoes)
+    return ganho_total
\ No newline at end of file
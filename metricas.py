@@ -0,0 +1,68 @@
+# metricas.py
+# OBJETIVO: Contadores e cronômetros internos do solver, para saber onde o tempo
+# é gasto: chamadas e tempo do Dijkstra, acertos/falhas dos caches de distância,
+# avaliações e melhorias por vizinhança e o tempo de cada etapa (leitura, grafo,
+# construtivo, melhoria).
+#
+# Há um registro global (METRICAS) porque cada instância é resolvida por vez em
+# um processo; quem resolve uma instância chama METRICAS.reiniciar() antes.
+# As operações são somas em dicionário, feitas fora dos laços mais internos
+# (as vizinhanças acumulam em variáveis locais e registram uma vez por chamada),
+# então o custo é desprezível e as métricas podem ficar sempre ligadas.
+
+import json
+import time
+from contextlib import contextmanager
+
+class Metricas:
+    """
+    Registro de contadores (inteiros) e tempos acumulados (segundos), por nome.
+    Os nomes usam o formato "grupo.item", por exemplo "dijkstra.chamadas".
+    """
+    def __init__(self):
+        self.contadores = {}
+        self.tempos = {}
+
+    def reiniciar(self):
+        """Zera todos os contadores e tempos."""
+        self.contadores.clear()
+        self.tempos.clear()
+
+    def contar(self, nome, quantidade=1):
+        self.contadores[nome] = self.contadores.get(nome, 0) + quantidade
+
+    def adicionar_tempo(self, nome, segundos):
+        self.tempos[nome] = self.tempos.get(nome, 0.0) + segundos
+
+    @contextmanager
+    def cronometrar(self, nome):
+        """Bloco 'with' que soma o tempo gasto dentro dele em 'nome'."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.adicionar_tempo(nome, time.perf_counter() - inicio)
+
+    def resumo(self):
+        """
+        Retorna um dicionário com contadores, tempos e taxas derivadas: para cada
+        vizinhança com avaliações e tempo, "<vizinhança>.avaliacoes_por_segundo".
+        """
+        taxas = {}
+        for nome, quantidade in self.contadores.items():
+            if nome.endswith(".avaliacoes"):
+                grupo = nome[:-len(".avaliacoes")]
+                tempo = self.tempos.get(f"vizinhanca.{grupo}", 0.0)
+                if tempo > 0:
+                    taxas[f"{grupo}.avaliacoes_por_segundo"] = quantidade / tempo
+        return {"contadores": dict(self.contadores), "tempos": dict(self.tempos), "taxas": taxas}
+
+    def salvar_json(self, caminho, extras=None):
+        """Grava o resumo (mais os campos de 'extras', se houver) em um arquivo JSON."""
+        conteudo = dict(extras or {})
+        conteudo.update(self.resumo())
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(conteudo, f, indent=2, ensure_ascii=False)
+
+# Registro global usado por todos os módulos do solver.
+METRICAS = Metricas()
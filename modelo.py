@@ -0,0 +1,176 @@
+# modelo.py
+# OBJETIVO: Representação compacta dos serviços e das rotas usada pelo construtivo
+# e pela busca local. Em vez de um dicionário por serviço e de tuplas/strings por
+# rota, os dados ficam em arrays tipados paralelos e cada rota guarda apenas uma
+# sequência de inteiros. Os textos legíveis só são montados na hora da saída.
+#
+# SERVIÇO ORIENTADO: cada posição de uma rota guarda um "código" que identifica o
+# serviço e o sentido em que ele é percorrido:
+#     codigo = 2 * global_id + invertido
+# onde 'invertido' = 1 significa percorrer a aresta de 'v' para 'u'. Nós e arcos
+# são sempre usados com invertido = 0.
+#
+# DEPÓSITO: o global_id 0 não é um serviço; os códigos 0 e 1 representam o
+# depósito (início e fim no nó do depósito). Assim, "sair do depósito" e "sair do
+# fim de um serviço" são a mesma consulta: fim[codigo_anterior].
+
+from array import array
+
+TIPO_NO, TIPO_ARESTA, TIPO_ARCO = 0, 1, 2
+CODIGO_DEPOSITO = 0
+
+def codigo(global_id, invertido=0):
+    """Código do serviço 'global_id' percorrido no sentido indicado."""
+    return 2 * global_id + invertido
+
+class Servicos:
+    """
+    Todos os serviços requeridos em arrays paralelos indexados pelo 'global_id'
+    (a posição 0 é o depósito, ver CODIGO_DEPOSITO). A ordem dos ids segue a leitura: primeiro os nós,
+    depois as arestas e por fim os arcos.
+
+    Além dos dados do arquivo, guarda para cada CÓDIGO (serviço + sentido) o índice,
+    na matriz de distâncias do Grafo, do nó onde o serviço começa ('inicio') e
+    termina ('fim'), e para cada serviço o custo fixo de atendê-lo ('custo' =
+    custo de serviço + custo de travessia).
+    """
+    __slots__ = ("total", "tipo", "u", "v", "demanda", "custo", "inicio", "fim")
+
+    def __init__(self, dados, indice):
+        reqs = dados["requisitos"]
+        listas = ((TIPO_NO, reqs["nos"]), (TIPO_ARESTA, reqs["arestas"]), (TIPO_ARCO, reqs["arcos"]))
+        m = sum(len(lista) for _, lista in listas)
+        self.total = m
+        self.tipo = array('b', [0]) * (m + 1)
+        self.u = array('l', [0]) * (m + 1)
+        self.v = array('l', [0]) * (m + 1)
+        self.demanda = array('l', [0]) * (m + 1)
+        self.custo = array('d', [0.0]) * (m + 1)
+        self.inicio = array('l', [0]) * (2 * (m + 1))
+        self.fim = array('l', [0]) * (2 * (m + 1))
+        i_deposito = indice[dados["deposito"]]
+        self.inicio[0] = self.inicio[1] = self.fim[0] = self.fim[1] = i_deposito
+
+        global_id = 1
+        for tipo, lista in listas:
+            for s in lista:
+                u, v = s["u"], s["v"]
+                self.tipo[global_id] = tipo
+                self.u[global_id] = u
+                self.v[global_id] = v
+                self.demanda[global_id] = s["demanda"]
+                self.custo[global_id] = s["s_custo"] + s["t_custo"]
+                iu, iv = indice[u], indice[v]
+                self.inicio[2 * global_id], self.fim[2 * global_id] = iu, iv
+                self.inicio[2 * global_id + 1], self.fim[2 * global_id + 1] = iv, iu
+                global_id += 1
+
+    def ids(self):
+        """Todos os global_ids, em ordem."""
+        return range(1, self.total + 1)
+
+    def pontas(self, cod):
+        """Retorna (p1, p2): os nós de início e de fim do serviço orientado 'cod'."""
+        global_id = cod >> 1
+        if cod & 1:
+            return self.v[global_id], self.u[global_id]
+        return self.u[global_id], self.v[global_id]
+
+    def inverter(self, cod):
+        """Código do mesmo serviço no sentido oposto. Nós e arcos não mudam."""
+        return cod ^ 1 if self.tipo[cod >> 1] == TIPO_ARESTA else cod
+
+
+class Rota:
+    """
+    Uma rota: a sequência de códigos de serviços orientados, mantida junto com
+    arrays auxiliares que são atualizados a cada modificação:
+        - inicios[i] / fins[i]: índices na matriz do início e do fim do i-ésimo serviço;
+        - custo_acum[i]: custo desde o depósito até o fim do serviço i - 1
+          (custo_acum[0] = 0);
+        - carga_acum[i]: demanda dos i primeiros serviços.
+    'custo' (com a volta ao depósito) e 'demanda' são sempre os totais da rota.
+
+    As operações de modificação só recalculam os prefixos a partir da primeira
+    posição alterada. Elas recebem o Grafo como parâmetro (em vez de guardá-lo)
+    para que a rota continue leve para copiar e serializar.
+    """
+    __slots__ = ("seq", "inicios", "fins", "custo_acum", "carga_acum", "demanda", "custo")
+
+    def __init__(self, seq, grafo):
+        servicos = grafo.servicos
+        self.seq = array('l', seq)
+        self.inicios = array('l', [servicos.inicio[cod] for cod in self.seq])
+        self.fins = array('l', [servicos.fim[cod] for cod in self.seq])
+        self.custo_acum = array('d', [0.0]) * (len(self.seq) + 1)
+        self.carga_acum = array('l', [0]) * (len(self.seq) + 1)
+        self._recalcular_desde(0, grafo)
+
+    def __len__(self):
+        return len(self.seq)
+
+    def _recalcular_desde(self, pos, grafo):
+        """Refaz os prefixos de custo e carga da posição 'pos' em diante e os totais."""
+        matriz, k = grafo.matriz, grafo.k
+        custo_fixo, demanda = grafo.servicos.custo, grafo.servicos.demanda
+        seq, inicios, fins = self.seq, self.inicios, self.fins
+        custo_acum, carga_acum = self.custo_acum, self.carga_acum
+        n = len(seq)
+
+        anterior = fins[pos - 1] if pos > 0 else grafo.i_deposito
+        for i in range(pos, n):
+            id_servico = seq[i] >> 1
+            custo_acum[i + 1] = custo_acum[i] + matriz[anterior * k + inicios[i]] + custo_fixo[id_servico]
+            carga_acum[i + 1] = carga_acum[i] + demanda[id_servico]
+            anterior = fins[i]
+
+        self.custo = custo_acum[n] + matriz[anterior * k + grafo.i_deposito] if n else 0.0
+        self.demanda = carga_acum[n]
+
+    def inserir(self, pos, cod, grafo):
+        """Insere o serviço orientado 'cod' na posição 'pos'."""
+        self.seq.insert(pos, cod)
+        self.inicios.insert(pos, grafo.servicos.inicio[cod])
+        self.fins.insert(pos, grafo.servicos.fim[cod])
+        self.custo_acum.append(0.0)
+        self.carga_acum.append(0)
+        self._recalcular_desde(pos, grafo)
+
+    def remover(self, pos, grafo):
+        """Remove e retorna o código do serviço na posição 'pos'."""
+        cod = self.seq.pop(pos)
+        self.inicios.pop(pos)
+        self.fins.pop(pos)
+        self.custo_acum.pop()
+        self.carga_acum.pop()
+        self._recalcular_desde(pos, grafo)
+        return cod
+
+    def substituir(self, pos, cod, grafo):
+        """Troca o serviço da posição 'pos' por 'cod' e retorna o código antigo."""
+        antigo = self.seq[pos]
+        self.seq[pos] = cod
+        self.inicios[pos] = grafo.servicos.inicio[cod]
+        self.fins[pos] = grafo.servicos.fim[cod]
+        self._recalcular_desde(pos, grafo)
+        return antigo
+
+    def inverter_trecho(self, j, k, grafo):
+        """
+        Inverte a ordem dos serviços nas posições j..k (inclusive), trocando também
+        o sentido das arestas do trecho.
+        """
+        servicos = grafo.servicos
+        trecho = array('l', [servicos.inverter(cod) for cod in reversed(self.seq[j:k + 1])])
+        self.seq[j:k + 1] = trecho
+        self.inicios[j:k + 1] = array('l', [servicos.inicio[cod] for cod in trecho])
+        self.fins[j:k + 1] = array('l', [servicos.fim[cod] for cod in trecho])
+        self._recalcular_desde(j, grafo)
+
+    def descricao(self, servicos):
+        """Lista de textos '(S id,p1,p2)' de cada serviço, para a escrita da solução."""
+        textos = []
+        for cod in self.seq:
+            p1, p2 = servicos.pontas(cod)
+            textos.append(f"(S {cod >> 1},{p1},{p2})")
+        return textos
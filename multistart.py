@@ -0,0 +1,107 @@
+# multistart.py
+# OBJETIVO: Rodar várias vezes o par construtivo aleatorizado + VNS sobre a
+# mesma instância, em processos paralelos, e ficar com a melhor solução.
+# Em uma máquina com vários núcleos, isso troca núcleos ociosos por qualidade
+# de solução no mesmo tempo de relógio.
+#
+# COMPARTILHAMENTO DA MATRIZ: o processo principal constrói o Grafo uma única
+# vez, com o cache em disco ligado (ver cache_disco.py). Cada processo de
+# trabalho abre o mesmo arquivo via mmap, sem rodar o Dijkstra: todos leem as
+# mesmas páginas do cache do sistema operacional, então a matriz existe uma só
+# vez na memória, qualquer que seja o número de processos.
+#
+# O início 0 usa a construção determinística; os demais usam a semente
+# 'semente_base + i' (construtivo com lista restrita de candidatos).
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+from leitura import carregar_instancia
+from grafo import Grafo
+from construtivo import CONSTRUTIVOS
+from melhoria import aprimorar_solucao_vns
+from modelo import Rota
+from cache_disco import hash_instancia, salvar_matriz
+
+# Estado de cada processo de trabalho, preenchido por _inicializar_trabalhador.
+_DADOS = None
+_GRAFO = None
+
+def _inicializar_trabalhador(dados, pasta_cache):
+    """Abre a matriz compartilhada (mmap do cache em disco) uma vez por processo."""
+    global _DADOS, _GRAFO
+    sys.stdout = open(os.devnull, "w")
+    _DADOS = dados
+    _GRAFO = Grafo(dados, pasta_cache)
+
+def _executar_inicio(semente, tamanho_rcl, tempo_vns, construtivo):
+    """Um início: construtivo (determinístico se 'semente' for None) + VNS. Retorna (custo, sequências, semente)."""
+    rotas, grafo = CONSTRUTIVOS[construtivo](_DADOS, grafo=_GRAFO, semente=semente, tamanho_rcl=tamanho_rcl)
+    custo = aprimorar_solucao_vns(rotas, _DADOS, grafo, tempo_limite=tempo_vns)
+    return custo, [list(r.seq) for r in rotas], semente
+
+def resolver_multistart(dados, num_inicios, num_processos=None, pasta_cache=None, tamanho_rcl=3,
+                        semente_base=0, tempo_vns=None, construtivo="guloso", max_cache_bytes=None):
+    """
+    Executa 'num_inicios' pares construtivo + VNS em até 'num_processos' processos
+    (padrão: número de CPUs) e retorna (rotas, grafo, custo, semente) da melhor
+    solução. 'semente' é None quando a melhor veio do início determinístico.
+    'construtivo' escolhe a heurística inicial (ver construtivo.CONSTRUTIVOS).
+    'tempo_vns' é o orçamento do VNS de cada início (None = melhoria.MAX_TIME_GLOBAL_SECONDS).
+    'max_cache_bytes' é repassado ao Grafo (matriz em disco se passar do limite).
+
+    Sem 'pasta_cache', a matriz é compartilhada por meio de uma pasta temporária,
+    apagada ao final. Com 'num_processos' == 1, tudo roda no próprio processo.
+    """
+    sementes = [None] + [semente_base + i for i in range(1, num_inicios)]
+    num_processos = min(num_processos or os.cpu_count() or 1, len(sementes))
+
+    # Constrói (ou abre do cache) a matriz uma única vez.
+    grafo = Grafo(dados, pasta_cache, max_cache_bytes=max_cache_bytes)
+
+    with tempfile.TemporaryDirectory(prefix="carp-ms-") as pasta_temporaria:
+        pasta = pasta_cache
+        if pasta is None and num_processos > 1:
+            # Sem cache do usuário, a matriz vai para uma pasta temporária só para os
+            # trabalhadores; o Grafo do processo principal continua em memória, para
+            # que a pasta possa ser apagada (no Windows, um arquivo mapeado não pode).
+            pasta = pasta_temporaria
+            salvar_matriz(pasta, hash_instancia(dados, grafo.nos_matriz), grafo.nos_matriz, grafo.matriz)
+
+        if num_processos == 1:
+            global _DADOS, _GRAFO
+            _DADOS, _GRAFO = dados, grafo
+            resultados = [_executar_inicio(s, tamanho_rcl, tempo_vns, construtivo) for s in sementes]
+        else:
+            with multiprocessing.Pool(num_processos, initializer=_inicializar_trabalhador, initargs=(dados, pasta)) as pool:
+                resultados = pool.starmap(_executar_inicio, [(s, tamanho_rcl, tempo_vns, construtivo) for s in sementes])
+
+    # Menor custo; em caso de empate, o início que veio primeiro.
+    custo, sequencias, semente = min(resultados, key=lambda r: r[0])
+    rotas = [Rota(seq, grafo) for seq in sequencias]
+    return rotas, grafo, custo, semente
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-start (construtivo aleatorizado + VNS) para UMA instância.")
+    parser.add_argument("instancia", help="Arquivo .dat da instância.")
+    parser.add_argument("--inicios", type=int, default=8, help="Número de inícios (padrão: 8).")
+    parser.add_argument("--processos", type=int, default=None, help="Processos em paralelo (padrão: número de CPUs).")
+    parser.add_argument("--rcl", type=int, default=3, help="Tamanho da lista restrita de candidatos (padrão: 3).")
+    parser.add_argument("--semente", type=int, default=0, help="Semente base (padrão: 0).")
+    parser.add_argument("--construtivo", choices=sorted(CONSTRUTIVOS), default="guloso", help="Heurística construtiva (padrão: guloso).")
+    parser.add_argument("--tempo-vns", type=float, default=None, help="Orçamento, em segundos, do VNS de cada início (padrão: MAX_TIME_GLOBAL_SECONDS).")
+    parser.add_argument("--max-cache-mb", type=float, default=None, help="Limite de memória, em MB, das distâncias: uma matriz maior que isso fica em disco, mapeada (ver grafo.Grafo).")
+    args = parser.parse_args()
+    max_cache_bytes = int(args.max_cache_mb * 2**20) if args.max_cache_mb is not None else None
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    dados = carregar_instancia(args.instancia, os.path.join(base_dir, "CacheInstancias"))
+    rotas, _, custo, semente = resolver_multistart(dados, args.inicios, args.processos, os.path.join(base_dir, "CacheDistancias"),
+                                                   args.rcl, args.semente, args.tempo_vns, args.construtivo, max_cache_bytes)
+    origem = "início determinístico" if semente is None else f"semente {semente}"
+    print(f"Melhor custo: {int(round(custo))}, Rotas: {len(rotas)} ({origem})")
+
+if __name__ == "__main__":
+    main()
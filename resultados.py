@@ -0,0 +1,83 @@
+# resultados.py
+# OBJETIVO: Registro permanente dos resultados do processamento em lote
+# (rodar_todas.py), para que uma execução interrompida possa ser retomada sem
+# resolver de novo as instâncias que já terminaram.
+#
+# FORMATO: um arquivo JSONL (um objeto JSON por linha) que só recebe linhas no
+# final. Cada linha guarda uma execução de uma instância: arquivo, chave da
+# configuração, parâmetros, status, custo, número de rotas, tempo total, tempo
+# de cada etapa e a origem da solução inicial. Cada linha é gravada e enviada
+# ao disco (fsync) assim que a instância termina; se o processo cair no meio de
+# uma escrita, a linha incompleta é ignorada na leitura.
+#
+# CHAVE: hash do conteúdo do arquivo da instância junto com os parâmetros da
+# execução. Mudar a instância ou qualquer parâmetro gera outra chave, então só
+# é pulado o que foi resolvido exatamente com a mesma configuração.
+
+import hashlib
+import json
+import os
+import time
+
+def chave_execucao(caminho_instancia, parametros):
+    """Chave da execução: hash do conteúdo da instância e dos 'parametros' (dict serializável)."""
+    h = hashlib.sha256()
+    with open(caminho_instancia, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    h.update(json.dumps(parametros, sort_keys=True).encode())
+    return h.hexdigest()[:16]
+
+class RegistroResultados:
+    """Arquivo JSONL de resultados, só com acréscimos (ver o cabeçalho do módulo)."""
+    def __init__(self, caminho):
+        self.caminho = caminho
+
+    def ler(self):
+        """Todos os registros válidos, na ordem em que foram gravados."""
+        if not os.path.exists(self.caminho):
+            return []
+        registros = []
+        with open(self.caminho, encoding="utf-8") as f:
+            for linha in f:
+                try:
+                    registros.append(json.loads(linha))
+                except json.JSONDecodeError:
+                    continue # Linha incompleta de uma execução interrompida.
+        return registros
+
+    def concluidas(self):
+        """Dicionário chave -> último registro com status "ok"."""
+        return {r["chave"]: r for r in self.ler() if r.get("status") == "ok"}
+
+    def registrar(self, resultado, chave, parametros):
+        """
+        Acrescenta o resultado de uma instância (dicionário retornado por
+        rodar_todas.resolver_instancia ou com status de erro) e o envia ao disco.
+        """
+        tempos = resultado.get("metricas", {}).get("tempos", {})
+        registro = {
+            "arquivo": resultado["arquivo"],
+            "chave": chave,
+            "parametros": parametros,
+            "status": resultado["status"],
+            "custo": resultado.get("custo"),
+            "rotas": resultado.get("rotas"),
+            "tempo": resultado.get("tempo"),
+            "origem": resultado.get("origem"),
+            "etapas": {nome.split(".", 1)[1]: t for nome, t in tempos.items() if nome.startswith("etapa.")},
+            "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        pasta = os.path.dirname(self.caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        linha = json.dumps(registro, ensure_ascii=False) + "\n"
+        with open(self.caminho, "a+b") as f:
+            # Se a última linha ficou incompleta, começa em uma linha nova.
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    linha = "\n" + linha
+            f.write(linha.encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
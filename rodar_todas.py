@@ -3,72 +3,290 @@
 # encontradas na pasta "Ins", resolve cada uma e salva o arquivo de solução
 # no formato especificado no trabalho.
 
+import argparse
+import multiprocessing
 import os
+import queue
+import sys
 import time
-from leitura import ler_instancia_completa
-from construtivo import gerar_solucao_viavel
+import traceback
+from leitura import carregar_instancia
+from grafo import Grafo
+from carregar_solucao import carregar_solucao
+from construtivo import CONSTRUTIVOS
 from melhoria import aprimorar_solucao_vns
+from metricas import METRICAS
+from resultados import RegistroResultados, chave_execucao
 
-def escrever_solucao_formato_pdf(nome_arquivo, rotas_info, custo_total, clocks_heuristica_secs):
+# Os tempos são escritos em "clocks" como os do clock() do C em sistemas POSIX.
+CLOCKS_POR_SEGUNDO = 1_000_000
+
+def escrever_solucao_formato_pdf(nome_arquivo, rotas_info, custo_total, clocks_heuristica_secs, grafo):
     """
     Função auxiliar para escrever o arquivo de solução (sol-nomeInstancia.dat)
-    no formato exato exigido para a entrega.
+    no formato exato exigido para a entrega:
+        custo total
+        número de rotas
+        clocks da execução completa
+        clocks até encontrar a solução
+        0 1 <rota> <demanda> <custo> <visitas> (D 0,dep,dep) (S id,p1,p2) ... (D 0,dep,dep)
+    com uma linha por rota (numeradas a partir de 1); as visitas contam as duas
+    passagens pelo depósito. Como a melhor solução é a final, as duas linhas de
+    clocks recebem o mesmo valor.
+
+    OTIMIZAÇÃO: o arquivo é gerado em um único fluxo com buffer grande, sem uma
+    escrita por serviço, em um temporário que só substitui o arquivo final quando
+    está completo (uma interrupção nunca deixa um sol-*.dat pela metade).
+    """
+    deposito = grafo.nos_matriz[grafo.i_deposito]
+    visita_deposito = f"(D 0,{deposito},{deposito})"
+    clocks = int(round(clocks_heuristica_secs * CLOCKS_POR_SEGUNDO))
+
+    def linhas():
+        yield f"{int(round(custo_total))}\n{len(rotas_info)}\n{clocks}\n{clocks}\n"
+        for id_rota, rota in enumerate(rotas_info, 1):
+            visitas = " ".join([visita_deposito, *rota.descricao(grafo.servicos), visita_deposito])
+            yield f" 0 1 {id_rota} {rota.demanda} {int(round(rota.custo))} {len(rota) + 2} {visitas}\n"
+
+    temporario = f"{nome_arquivo}.{os.getpid()}.tmp"
+    with open(temporario, "w", encoding="utf-8", buffering=1 << 16) as f:
+        f.writelines(linhas())
+    os.replace(temporario, nome_arquivo)
+
+def resolver_instancia(path, pasta_saida, pasta_cache, pasta_compilados=None, pasta_metricas=None, opcoes_vns=None, construtivo="guloso", partir_da_solucao=False, opcoes_grafo=None):
+    """
+    Resolve UMA instância (leitura, construtivo, melhoria), grava o arquivo de
+    solução e retorna um dicionário com o resumo do resultado.
+    'pasta_compilados' guarda a versão binária das instâncias (ver leitura.carregar_instancia).
+    Se 'pasta_metricas' for informada, as métricas da execução (ver metricas.py) são
+    gravadas lá em 'metricas-<instância>.json'; elas também voltam no resultado.
+    'opcoes_vns' é um dicionário de parâmetros extras repassados a aprimorar_solucao_vns
+    (por exemplo {"tempo_limite": 60, "primeira_melhoria": True}).
+    'construtivo' escolhe a heurística inicial (ver construtivo.CONSTRUTIVOS).
+    Com 'partir_da_solucao', se já existir um sol-<instância>.dat válido em
+    'pasta_saida' (ver carregar_solucao.py), a melhoria parte dele em vez do
+    construtivo; se ele for inválido, o construtivo é usado.
+    'opcoes_grafo' é um dicionário de parâmetros extras repassados ao Grafo (por
+    exemplo {"max_cache_bytes": 2**30}, ver grafo.Grafo).
     """
-    # ... (código de formatação da saída)
-    pass # O código interno já é autoexplicativo para a formatação.
+    fname = os.path.basename(path)
+    METRICAS.reiniciar()
 
-# ... (código completo da função escrever_solucao_formato_pdf)
+    # --- FLUXO DE EXECUÇÃO (igual ao mainTeste) ---
+    t0 = time.time()
+    
+    # 1. Leitura
+    with METRICAS.cronometrar("etapa.leitura"):
+        dados = carregar_instancia(path, pasta_compilados)
+    
+    # 2. Solução inicial: a solução anterior (se pedida e válida) ou o construtivo
+    #    (o tempo do grafo e o da construção são medidos separadamente).
+    with METRICAS.cronometrar("etapa.grafo"):
+        grafo_obj = Grafo(dados, pasta_cache, **(opcoes_grafo or {}))
+    saida = os.path.join(pasta_saida, f"sol-{fname}")
+    rotas_info, origem = None, construtivo
+    if partir_da_solucao and os.path.exists(saida):
+        try:
+            with METRICAS.cronometrar("etapa.solucao_anterior"):
+                rotas_info = carregar_solucao(saida, dados, grafo_obj)
+            origem = "solucao_anterior"
+        except ValueError as e:
+            print(f"AVISO: solução anterior descartada, usando o construtivo. {e}")
+    if rotas_info is None:
+        rotas_info, grafo_obj = CONSTRUTIVOS[construtivo](dados, pasta_cache, grafo=grafo_obj)
+    
+    # 3. Melhoria
+    with METRICAS.cronometrar("etapa.melhoria"):
+        aprimorar_solucao_vns(rotas_info, dados, grafo_obj, **(opcoes_vns or {}))
+
+    t1 = time.time()
+    
+    # 4. ESCRITA DA SOLUÇÃO
+    clocks_heuristica_secs = t1 - t0
+    custo_total = sum(r.custo for r in rotas_info)
+    
+    escrever_solucao_formato_pdf(saida, rotas_info, custo_total, clocks_heuristica_secs, grafo_obj)
+    resultado = {"arquivo": fname, "status": "ok", "custo": custo_total, "rotas": len(rotas_info), "tempo": clocks_heuristica_secs, "origem": origem}
+    if pasta_metricas is not None:
+        os.makedirs(pasta_metricas, exist_ok=True)
+        METRICAS.salvar_json(os.path.join(pasta_metricas, f"metricas-{os.path.splitext(fname)[0]}.json"), resultado)
+    resultado["metricas"] = METRICAS.resumo()
+    return resultado
+
+def _trabalhador(path, pasta_saida, pasta_cache, pasta_compilados, pasta_metricas, opcoes_vns, construtivo, partir_da_solucao, opcoes_grafo, fila):
+    """
+    Ponto de entrada de cada processo do modo paralelo. As mensagens de progresso
+    do solver são descartadas (o processo principal imprime o resumo) e qualquer
+    exceção vira um resultado com status "erro".
+    """
+    sys.stdout = open(os.devnull, "w")
+    try:
+        resultado = resolver_instancia(path, pasta_saida, pasta_cache, pasta_compilados, pasta_metricas, opcoes_vns, construtivo, partir_da_solucao, opcoes_grafo)
+    except Exception as e:
+        resultado = {"arquivo": os.path.basename(path), "status": "erro", "mensagem": f"{e}\n{traceback.format_exc()}"}
+    fila.put(resultado)
+
+def resolver_em_paralelo(arquivos, pasta_ins, pasta_saida, pasta_cache, num_processos, tempo_limite=None, pasta_compilados=None, pasta_metricas=None, opcoes_vns=None, construtivo="guloso", partir_da_solucao=False, opcoes_grafo=None):
+    """
+    Resolve as instâncias em até 'num_processos' processos simultâneos, um processo
+    por instância, e devolve (via 'yield') o resultado de cada uma assim que termina.
+
+    - Se 'tempo_limite' (segundos) for informado, o processo de uma instância que
+      passar desse tempo é encerrado e o resultado vem com status "tempo_esgotado".
+    - Se o processo morrer sem devolver resultado (falha do interpretador, falta de
+      memória etc.), o resultado vem com status "falha" e o lote continua.
+    Antes de declarar estouro de tempo ou falha, a fila é lida mais uma vez: uma
+    instância cujo resultado já chegou é sempre repassada com esse resultado.
+    """
+    fila = multiprocessing.Queue()
+    pendentes = list(arquivos)
+    ativos = {} # nome do arquivo -> (processo, instante de início)
+    recebidos = {} # nome do arquivo -> resultado já lido da fila
+
+    def ler_fila(espera=None):
+        """Move para 'recebidos' tudo o que está na fila, esperando até 'espera' segundos pelo primeiro."""
+        try:
+            resultado = fila.get(timeout=espera) if espera else fila.get_nowait()
+            while True:
+                recebidos[resultado["arquivo"]] = resultado
+                resultado = fila.get_nowait()
+        except queue.Empty:
+            pass
+
+    while pendentes or ativos:
+        # Mantém até 'num_processos' instâncias em execução.
+        while pendentes and len(ativos) < num_processos:
+            fname = pendentes.pop(0)
+            processo = multiprocessing.Process(target=_trabalhador, args=(os.path.join(pasta_ins, fname), pasta_saida, pasta_cache, pasta_compilados, pasta_metricas, opcoes_vns, construtivo, partir_da_solucao, opcoes_grafo, fila), daemon=True)
+            processo.start()
+            ativos[fname] = (processo, time.time())
+
+        # Repassa todos os resultados que ficaram prontos (e não só o primeiro).
+        ler_fila(0.2)
+        for fname in [f for f in recebidos if f in ativos]:
+            processo, _ = ativos.pop(fname)
+            processo.join()
+            yield recebidos.pop(fname)
+
+        # Verifica estouro de tempo e processos que morreram sem responder.
+        agora = time.time()
+        for fname, (processo, inicio) in list(ativos.items()):
+            estourou = tempo_limite is not None and agora - inicio > tempo_limite
+            if not estourou and processo.is_alive():
+                continue
+            # Última leitura da fila: o resultado pode ter chegado depois da leitura acima.
+            ler_fila()
+            del ativos[fname]
+            if fname in recebidos:
+                processo.join()
+                yield recebidos.pop(fname)
+            elif estourou:
+                processo.terminate()
+                processo.join()
+                yield {"arquivo": fname, "status": "tempo_esgotado", "tempo": agora - inicio}
+            else:
+                # Morreu sem devolver resultado, inclusive com código 0.
+                yield {"arquivo": fname, "status": "falha", "mensagem": f"processo terminou com código {processo.exitcode} sem devolver resultado"}
+
+def _imprimir_resultado(resultado):
+    """Imprime o resumo de uma instância resolvida (ou o motivo da falha)."""
+    if resultado["status"] == "ok":
+        print(f"    -> Concluído. Custo={int(round(resultado['custo']))}, Rotas={resultado['rotas']}, Tempo={resultado['tempo']:.4f}s.")
+    elif resultado["status"] == "tempo_esgotado":
+        print(f"    ERRO: '{resultado['arquivo']}' excedeu o tempo limite ({resultado['tempo']:.1f}s) e foi interrompida.")
+    else:
+        print(f"    ERRO FATAL ao processar '{resultado['arquivo']}': {resultado['mensagem']}")
 
 def main():
+    # --- PARÂMETROS DE LINHA DE COMANDO ---
+    parser = argparse.ArgumentParser(description="Resolve todas as instâncias da pasta Ins.")
+    parser.add_argument("--processos", type=int, default=1, help="Número de processos em paralelo (padrão: 1, sequencial).")
+    parser.add_argument("--tempo-limite", type=float, default=None, help="Tempo máximo, em segundos, por instância (modo em processos).")
+    parser.add_argument("--construtivo", choices=sorted(CONSTRUTIVOS), default="guloso", help="Heurística construtiva (padrão: guloso).")
+    parser.add_argument("--tempo-vns", type=float, default=None, help="Orçamento, em segundos, da fase de melhoria (padrão: MAX_TIME_GLOBAL_SECONDS).")
+    parser.add_argument("--primeira-melhoria", action="store_true", help="VNS com primeira melhoria e bits de não olhar.")
+    parser.add_argument("--processos-vizinhanca", type=int, default=None, help="Processos para dividir o Relocate/Swap de cada instância (ver vizinhanca_paralela.py).")
+    parser.add_argument("--partir-da-solucao", action="store_true", help="Aprimora a solução já existente em SolucoesFinais, quando válida, em vez de construir uma nova.")
+    parser.add_argument("--refazer", action="store_true", help="Resolve de novo mesmo as instâncias já concluídas com a mesma configuração.")
+    parser.add_argument("--max-cache-mb", type=float, default=None, help="Limite de memória, em MB, das distâncias: uma matriz maior que isso fica em disco, mapeada (ver grafo.Grafo).")
+    args = parser.parse_args()
+    # Os processos de trabalho do modo em processos são daemon e não podem criar outros.
+    if args.processos_vizinhanca and args.processos_vizinhanca > 1 and (args.processos > 1 or args.tempo_limite is not None):
+        parser.error("--processos-vizinhanca não pode ser combinado com --processos > 1 nem com --tempo-limite.")
+
+    # Parâmetros repassados a aprimorar_solucao_vns (ver melhoria.py).
+    opcoes_vns = {}
+    if args.tempo_vns is not None:
+        opcoes_vns["tempo_limite"] = args.tempo_vns
+    if args.primeira_melhoria:
+        opcoes_vns["primeira_melhoria"] = True
+    if args.processos_vizinhanca:
+        opcoes_vns["processos_vizinhanca"] = args.processos_vizinhanca
+    # Parâmetros repassados ao Grafo. Não mudam a solução, então não entram na chave da retomada.
+    opcoes_grafo = {}
+    if args.max_cache_mb is not None:
+        opcoes_grafo["max_cache_bytes"] = int(args.max_cache_mb * 2**20)
+
     # --- CONFIGURAÇÃO DOS DIRETÓRIOS ---
     base_dir = os.path.dirname(os.path.abspath(__file__))
     pasta_ins = os.path.join(base_dir, "Ins")
     pasta_saida = os.path.join(base_dir, "SolucoesFinais")
+    # Cache em disco das matrizes de distâncias (uma por instância, ver cache_disco.py).
+    pasta_cache = os.path.join(base_dir, "CacheDistancias")
+    # Versões binárias das instâncias, para pular a leitura do texto (ver leitura.py).
+    pasta_compilados = os.path.join(base_dir, "CacheInstancias")
+    # Métricas de cada execução em JSON (tempos por etapa, Dijkstra, vizinhanças; ver metricas.py).
+    pasta_metricas = os.path.join(base_dir, "Metricas")
+    # Registro de todas as execuções, usado para retomar um lote interrompido (ver resultados.py).
+    registro = RegistroResultados(os.path.join(base_dir, "Resultados", "resultados.jsonl"))
 
     if not os.path.exists(pasta_saida):
         os.makedirs(pasta_saida)
 
     # Encontra todos os arquivos .dat na pasta de instâncias.
     arquivos = sorted([f for f in os.listdir(pasta_ins) if f.endswith(".dat")])
+
+    # --- RETOMADA ---
+    # Pula as instâncias já resolvidas com a mesma configuração (mesmo conteúdo do
+    # arquivo e mesmos parâmetros) cujo arquivo de solução ainda existe.
+    parametros = {"construtivo": args.construtivo, "vns": opcoes_vns}
+    if args.partir_da_solucao:
+        parametros["partir_da_solucao"] = True
+    chaves = {fname: chave_execucao(os.path.join(pasta_ins, fname), parametros) for fname in arquivos}
+    if not args.refazer:
+        concluidas = registro.concluidas()
+        pular = [f for f in arquivos if chaves[f] in concluidas and os.path.exists(os.path.join(pasta_saida, f"sol-{f}"))]
+        if pular:
+            print(f"{len(pular)} instância(s) já resolvida(s) com esta configuração serão puladas (use --refazer para resolvê-las de novo).")
+            arquivos = [f for f in arquivos if f not in set(pular)]
     
     # --- LOOP DE PROCESSAMENTO EM LOTE ---
     total_arquivos = len(arquivos)
     print(f"Encontradas {total_arquivos} instâncias. Iniciando processamento...")
     start_time_total = time.time()
 
-    # Itera sobre cada arquivo de instância encontrado.
-    for idx, fname in enumerate(arquivos):
-        path = os.path.join(pasta_ins, fname)
-        print(f"[{idx + 1}/{total_arquivos}] Resolvendo: {fname}...")
-        try:
-            # --- FLUXO DE EXECUÇÃO (igual ao mainTeste, mas dentro de um loop) ---
-            t0 = time.time()
-            
-            # 1. Leitura
-            dados = ler_instancia_completa(path)
-            
-            # 2. Construtivo
-            rotas_info, grafo_obj = gerar_solucao_viavel(dados)
-            
-            # 3. Melhoria
-            aprimorar_solucao_vns(rotas_info, dados, grafo_obj)
-
-            t1 = time.time()
-            
-            # 4. ESCRITA DA SOLUÇÃO
-            clocks_heuristica_secs = t1 - t0
-            custo_total = sum(r["custo"] for r in rotas_info)
-            saida = os.path.join(pasta_saida, f"sol-{fname}")
-            
-            escrever_solucao_formato_pdf(saida, rotas_info, custo_total, clocks_heuristica_secs)
-            print(f"    -> Concluído. Custo={int(round(custo_total))}, Rotas={len(rotas_info)}, Tempo={clocks_heuristica_secs:.4f}s.")
-
-        except Exception as e:
-            # Tratamento de erro para não parar a execução em lote se uma instância falhar.
-            print(f"    ERRO FATAL ao processar '{fname}': {e}")
-            import traceback
-            traceback.print_exc()
-            continue
+    if args.processos > 1 or args.tempo_limite is not None:
+        # --- MODO EM PROCESSOS ---
+        # Cada instância roda em um processo separado; os resultados chegam na ordem em que terminam.
+        print(f"Usando {args.processos} processo(s) em paralelo.")
+        for idx, resultado in enumerate(resolver_em_paralelo(arquivos, pasta_ins, pasta_saida, pasta_cache, args.processos, args.tempo_limite, pasta_compilados, pasta_metricas, opcoes_vns, args.construtivo, args.partir_da_solucao, opcoes_grafo)):
+            print(f"[{idx + 1}/{total_arquivos}] {resultado['arquivo']}:")
+            _imprimir_resultado(resultado)
+            registro.registrar(resultado, chaves[resultado["arquivo"]], parametros)
+    else:
+        # Itera sobre cada arquivo de instância encontrado.
+        for idx, fname in enumerate(arquivos):
+            path = os.path.join(pasta_ins, fname)
+            print(f"[{idx + 1}/{total_arquivos}] Resolvendo: {fname}...")
+            try:
+                resultado = resolver_instancia(path, pasta_saida, pasta_cache, pasta_compilados, pasta_metricas, opcoes_vns, args.construtivo, args.partir_da_solucao, opcoes_grafo)
+                _imprimir_resultado(resultado)
+            except Exception as e:
+                # Tratamento de erro para não parar a execução em lote se uma instância falhar.
+                print(f"    ERRO FATAL ao processar '{fname}': {e}")
+                traceback.print_exc()
+                resultado = {"arquivo": fname, "status": "erro", "mensagem": str(e)}
+            registro.registrar(resultado, chaves[fname], parametros)
             
     end_time_total = time.time()
     print(f"\n Processamento concluído em {end_time_total - start_time_total:.2f} segundos.")
@@ -0,0 +1,101 @@
+# vizinhanca_paralela.py
+# OBJETIVO: Dividir a varredura do Relocate e do Swap de UMA solução entre vários
+# processos. Em uma instância muito grande, o paralelismo por instância
+# (rodar_todas.py --processos) ou por início (multistart.py) não ajuda a terminar
+# a busca local mais cedo; aqui, cada processo avalia os movimentos que partem de
+# um subconjunto das rotas e o processo principal fica com o melhor.
+#
+# COMPARTILHAMENTO DA MATRIZ: como no multistart.py, a matriz de distâncias é
+# gravada uma vez no formato do cache em disco (ver cache_disco.py) e cada
+# processo de trabalho a abre via mmap: ela não é copiada por processo nem
+# serializada a cada tarefa. Por tarefa, só vão as sequências das rotas (listas
+# de inteiros) e voltam (ganho, movimento, avaliações).
+#
+# EQUIVALÊNCIA: cada processo recebe as rotas de origem r1 com r1 % P == p. Na
+# redução, empates de ganho são decididos pelo menor movimento (r1, s1, r2, s2),
+# que é a ordem da varredura serial: o movimento escolhido é sempre o mesmo.
+
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+import weakref
+from grafo import Grafo
+from modelo import Rota
+from cache_disco import hash_instancia, salvar_matriz
+import melhoria
+
+# Estado de cada processo de trabalho, preenchido por _inicializar_trabalhador.
+_DADOS = None
+_GRAFO = None
+_VIZINHOS = None
+
+def _inicializar_trabalhador(dados, pasta, vizinhos):
+    """Abre a matriz compartilhada (mmap) uma vez por processo."""
+    global _DADOS, _GRAFO, _VIZINHOS
+    sys.stdout = open(os.devnull, "w")
+    _DADOS = dados
+    _GRAFO = Grafo(dados, pasta)
+    _VIZINHOS = vizinhos
+
+def _avaliar(nome, sequencias, origens, restante):
+    """Varre a vizinhança 'nome' a partir das rotas 'origens'. Retorna (ganho, movimento, avaliacoes)."""
+    rotas = [Rota(seq, _GRAFO) for seq in sequencias]
+    prazo = time.perf_counter() + restante if restante is not None else None
+    varrer = melhoria._varrer_relocate if nome == "relocate" else melhoria._varrer_swap
+    return varrer(rotas, _DADOS, _GRAFO, _VIZINHOS, prazo, None, origens)
+
+def _encerrar(pool, pasta):
+    pool.terminate()
+    pool.join()
+    shutil.rmtree(pasta, ignore_errors=True)
+
+class AvaliadorParalelo:
+    """
+    Pool de processos para a varredura do Relocate e do Swap (ver melhoria.py,
+    parâmetro 'avaliador'). Use como gerenciador de contexto ou chame fechar();
+    se nenhum dos dois acontecer (ex.: exceção no meio da busca), os processos e a
+    pasta temporária são liberados quando o objeto é coletado.
+
+    'vizinhos' é a lista de candidatos da vizinhança granular (ou None), a mesma
+    passada às funções find_best_*; ela é enviada aos processos uma única vez.
+    """
+    def __init__(self, dados, grafo, num_processos=None, vizinhos=None):
+        self.num_processos = max(1, num_processos or os.cpu_count() or 1)
+        # A matriz vai para uma pasta temporária só para os trabalhadores; o Grafo do
+        # processo principal continua como está.
+        self._pasta = tempfile.mkdtemp(prefix="carp-viz-")
+        salvar_matriz(self._pasta, hash_instancia(dados, grafo.nos_matriz), grafo.nos_matriz, grafo.matriz)
+        self._pool = multiprocessing.Pool(self.num_processos, initializer=_inicializar_trabalhador,
+                                          initargs=(dados, self._pasta, vizinhos))
+        self._finalizador = weakref.finalize(self, _encerrar, self._pool, self._pasta)
+
+    def melhor_movimento(self, nome, rotas_info, prazo=None):
+        """
+        Melhor movimento da vizinhança 'nome' ("relocate" ou "swap") sobre a solução,
+        sem aplicá-lo. Retorna (melhor_ganho, movimento, avaliacoes), como as
+        funções _varrer_* de melhoria.py.
+        """
+        sequencias = [list(r.seq) for r in rotas_info]
+        restante = max(0.0, prazo - time.perf_counter()) if prazo is not None else None
+        p = min(self.num_processos, len(rotas_info)) or 1
+        tarefas = [(nome, sequencias, set(range(i, len(rotas_info), p)), restante) for i in range(p)]
+
+        melhor_ganho, melhor_movimento, avaliacoes = 0, None, 0
+        for ganho, movimento, aval in self._pool.starmap(_avaliar, tarefas):
+            avaliacoes += aval
+            if movimento is not None and (ganho > melhor_ganho or (ganho == melhor_ganho and movimento < melhor_movimento)):
+                melhor_ganho, melhor_movimento = ganho, movimento
+        return melhor_ganho, melhor_movimento, avaliacoes
+
+    def fechar(self):
+        """Encerra os processos e apaga a pasta temporária da matriz."""
+        self._finalizador()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()